@@ -6,12 +6,35 @@
 # 编程语言常用技术是构建一个由 **回溯搜索** 和 **几种启发式信息** 组合而成的框架
 # 加入启发式是为了提高搜索的性能
 # 采用简单的递归回溯搜索法来求解约束满足问题
-from typing import Generic, TypeVar, Dict, List, Optional
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from multiprocessing import Event
 from abc import ABC, abstractmethod
 
 V = TypeVar("V")  # variable type
 D = TypeVar("D")  # domain type
 
+# 变量选择顺序: 声明顺序 / 最少剩余值 / 最少剩余值 + 度启发 (约束最多的变量优先)
+VARIABLE_ORDERS: Tuple[str, ...] = ("first", "mrv", "mrv_degree")
+# 值选择顺序: 值域顺序 / 最少约束值 (给邻居留下最多选择的值优先)
+VALUE_ORDERS: Tuple[str, ...] = ("domain", "lcv")
+# 约束传播: 不传播 / 前向检查 / 搜索前做一次 AC-3 再前向检查 / 维护弧相容 (MAC)
+PROPAGATIONS: Tuple[str, ...] = ("none", "forward_checking", "ac3", "mac")
+
 
 # Base class for all constraints
 class Constraint(Generic[V, D], ABC):
@@ -30,6 +53,63 @@ class Constraint(Generic[V, D], ABC):
     def satisfiled(self, assignment: Dict[V, D]) -> bool: ...
 
 
+class _Frame(Generic[V, D]):
+    """
+    显式栈上的一层: 正在赋值的变量、 它在 unassigned 中原来的下标、
+    候选值、 下一个要尝试的值的位置、 进入这一层时 trail 的长度，
+    以及回跳使用的冲突集
+    """
+
+    __slots__ = ("variable", "index", "values", "position", "mark", "conflicts")
+
+    def __init__(self, variable: V, index: int, values: List[D], mark: int) -> None:
+        self.variable: V = variable
+        self.index: int = index
+        self.values: List[D] = values
+        self.position: int = 0
+        self.mark: int = mark
+        self.conflicts: Set[V] = set()
+
+
+class _NogoodStore(Generic[V, D]):
+    """
+    Docstring for _NogoodStore
+    容量有限的 nogood 集合， 超出容量时淘汰最久没有命中的一条
+    每条 nogood 按其中的每个 (变量, 值) 建立索引， 赋值时只检查包含新赋值的 nogood
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit: int = limit
+        self._nogoods: OrderedDict[frozenset, None] = OrderedDict()
+        self._by_literal: Dict[Tuple[V, D], Set[frozenset]] = {}
+
+    def add(self, literals: List[Tuple[V, D]]) -> None:
+        nogood: frozenset = frozenset(literals)
+        if not nogood or nogood in self._nogoods:
+            return
+        self._nogoods[nogood] = None
+        for literal in nogood:
+            self._by_literal.setdefault(literal, set()).add(nogood)
+        if len(self._nogoods) > self._limit:
+            evicted, _ = self._nogoods.popitem(last=False)
+            for literal in evicted:
+                self._by_literal[literal].discard(evicted)
+
+    def match(self, variable: V, value: D, assignment: Dict[V, D]) -> Optional[List[V]]:
+        """
+        Docstring for match
+        新赋值 variable = value 之后， 是否有 nogood 的全部赋值都已成立
+
+        :return: 命中的 nogood 中的变量， 没有命中时返回 None
+        :rtype: List[V] | None
+        """
+        for nogood in self._by_literal.get((variable, value), ()):
+            if all(v in assignment and assignment[v] == d for v, d in nogood):
+                self._nogoods.move_to_end(nogood)
+                return [v for v, _ in nogood]
+        return None
+
+
 class CSP(Generic[V, D]):
     def __init__(self, variables: List[V], domains: Dict[V, List[D]]) -> None:
         """
@@ -46,6 +126,13 @@ class CSP(Generic[V, D]):
         self.variables: List[V] = variables
         self.domains: Dict[V, List[D]] = domains
         self.constraints: Dict[V, List[Constraint[V, D]]] = {}
+        # neighbours() 的缓存， 添加约束时清空
+        self._neighbours: Dict[V, Set[V]] = {}
+        # 二元约束按 (变量, 另一个变量) 索引， 供 AC-3 使用， 只为有二元约束的变量建立
+        self.binary: Dict[V, Dict[V, List[Constraint[V, D]]]] = {}
+        # 对称性声明， 见 add_symmetry / add_value_symmetry
+        self.symmetries: List[Callable[[V, D], Tuple[V, D]]] = []
+        self.interchangeable_values: bool = False
         for variable in self.variables:
             self.constraints[variable] = []
             if variable not in self.domains:
@@ -60,10 +147,34 @@ class CSP(Generic[V, D]):
         遍历给定约束涉及的所有变量， 并将其这一约束添加到每个变量的constraints映射中
         """
         for variable in constraint.variables:
-            if variable not in self.variables:
+            # self.constraints 的键就是所有变量， 用 dict 判断避免在 list 中线性查找
+            if variable not in self.constraints:
                 raise LookupError("Varaible in constraint not in CSP")
             else:
                 self.constraints[variable].append(constraint)
+        self._neighbours.clear()
+        if len(constraint.variables) == 2:
+            x, y = constraint.variables
+            self.binary.setdefault(x, {}).setdefault(y, []).append(constraint)
+            self.binary.setdefault(y, {}).setdefault(x, []).append(constraint)
+
+    def neighbours(self, variable: V) -> Set[V]:
+        """
+        Docstring for neighbours
+        与 variable 出现在同一约束中的其他变量， 供度启发、 最少约束值和前向检查使用
+        第一次用到时才计算， 涉及全部变量的大约束 (例如 QueenConstraint) 不会在建模时
+        产生 O(n^2) 的开销
+        """
+        result: Optional[Set[V]] = self._neighbours.get(variable)
+        if result is None:
+            result = {
+                v
+                for constraint in self.constraints[variable]
+                for v in constraint.variables
+                if v != variable
+            }
+            self._neighbours[variable] = result
+        return result
 
     def consistent(self, varaible: V, assignment: Dict[V, D]) -> bool:
         """
@@ -82,34 +193,749 @@ class CSP(Generic[V, D]):
                 return False
         return True
 
-    def backtracking_search(self, assignment: Dict[V, D] = {}) -> Optional[Dict[V, D]]:
+    def add_symmetry(self, symmetry: Callable[[V, D], Tuple[V, D]]) -> None:
+        """
+        Docstring for add_symmetry
+        声明一个对称: 把每个 (变量, 值) 映射为另一个 (变量, 值)， 并且把解映射为解
+        例如 N 皇后中棋盘旋转 90 度把 (列 c, 行 r) 映射为 (列 r, 行 n + 1 - c)
+        break_symmetry 时只保留在对称像中字典序最小的解 (lex-leader)，
+        比较按变量的声明顺序和值在值域中的位置进行
+        声明整个对称群 (恒等变换除外) 剪枝效果最好， 只声明一部分也不会丢失解的等价类
+
+        :param symmetry: (变量, 值) -> (变量, 值)
+        :type symmetry: Callable[[V, D], Tuple[V, D]]
+        """
+        self.symmetries.append(symmetry)
+
+    def add_value_symmetry(self) -> None:
+        """
+        Docstring for add_value_symmetry
+        声明所有值可以任意互换 (例如地图着色中颜色的置换)， 要求所有变量的值域相同
+        break_symmetry 时按声明顺序， 第 i 个值只有在前 i - 1 个值都已出现后才能使用
+        """
+        first: List[D] = self.domains[self.variables[0]]
+        if any(self.domains[v] != first for v in self.variables):
+            raise ValueError("Interchangeable values require identical domains.")
+        self.interchangeable_values = True
+
+    def _value_index(self) -> Dict[V, Dict[D, int]]:
+        # 值在值域中的位置， 定义对称破缺使用的字典序
+        return {
+            v: {value: i for i, value in enumerate(self.domains[v])}
+            for v in self.variables
+        }
+
+    def _lex_leader(self, assignment: Dict[V, D], index: Dict[V, Dict[D, int]]) -> bool:
+        """
+        Docstring for _lex_leader
+        部分赋值是否还可能扩展为其等价类中字典序最小的解
+        只比较声明顺序上第一个未确定的变量之前的部分， 因此对任意赋值顺序都成立
+        """
+        for symmetry in self.symmetries:
+            image: Dict[V, D] = dict(symmetry(v, d) for v, d in assignment.items())
+            for variable in self.variables:
+                if variable not in assignment or variable not in image:
+                    break
+                a: int = index[variable][assignment[variable]]
+                b: int = index[variable][image[variable]]
+                if a != b:
+                    if a > b:
+                        return False
+                    break
+        if self.interchangeable_values:
+            highest: int = -1
+            for variable in self.variables:
+                if variable not in assignment:
+                    break
+                a = index[variable][assignment[variable]]
+                if a > highest + 1:
+                    return False
+                highest = max(highest, a)
+        return True
+
+    def _orbit(self, solution: Dict[V, D]) -> List[Dict[V, D]]:
+        """
+        Docstring for _orbit
+        解在所有声明的对称 (及其组合) 下的全部像， 包括解本身
+        """
+        moves: List[Callable[[Dict[V, D]], Dict[V, D]]] = [
+            lambda s, g=g: dict(g(v, d) for v, d in s.items()) for g in self.symmetries
+        ]
+        if self.interchangeable_values:
+            # 相邻值的对换可以生成值的全部置换
+            values: List[D] = self.domains[self.variables[0]]
+            for i in range(len(values) - 1):
+                swap: Dict[D, D] = {values[i]: values[i + 1], values[i + 1]: values[i]}
+                moves.append(
+                    lambda s, swap=swap: {v: swap.get(d, d) for v, d in s.items()}
+                )
+        seen: Set[frozenset] = {frozenset(solution.items())}
+        orbit: List[Dict[V, D]] = [dict(solution)]
+        for current in orbit:
+            for move in moves:
+                image: Dict[V, D] = move(current)
+                key: frozenset = frozenset(image.items())
+                if key not in seen:
+                    seen.add(key)
+                    orbit.append(image)
+        return orbit
+
+    def legal_values(
+        self,
+        variable: V,
+        assignment: Dict[V, D],
+        values: Optional[List[D]] = None,
+    ) -> List[D]:
+        """
+        Docstring for legal_values
+        在当前赋值下 variable 仍然可以取的值
+        会临时修改 assignment， 返回前恢复原状
+
+        :param variable: 未赋值的变量
+        :type variable: V
+        :param assignment: 当前赋值
+        :type assignment: Dict[V, D]
+        :param values: 候选值， 默认为 variable 的整个值域
+        :type values: List[D] | None
+        :return: 满足约束的值
+        :rtype: List[D]
+        """
+        legal: List[D] = []
+        for value in self.domains[variable] if values is None else values:
+            assignment[variable] = value
+            if self.consistent(variable, assignment):
+                legal.append(value)
+        assignment.pop(variable, None)
+        return legal
+
+    def _select_variable(
+        self,
+        assignment: Dict[V, D],
+        unassigned: List[V],
+        domains: Dict[V, List[D]],
+        variable_order: str,
+        propagation: str,
+    ) -> Tuple[int, List[D]]:
+        """
+        Docstring for _select_variable
+        选出下一个要赋值的变量
+        开启约束传播时 domains 中只剩合法值， 不必再逐个检查
+
+        :return: 变量在 unassigned 中的下标， 以及它的候选值
+        :rtype: Tuple[int, List[D]]
+        """
+        # unassigned 按声明顺序倒序保存， 末尾就是第一个未赋值的变量
+        if variable_order == "first":
+            return len(unassigned) - 1, domains[unassigned[-1]]
+
+        best: int = -1
+        best_values: List[D] = []
+        best_key: Tuple[int, int] = (0, 0)
+        for index in range(len(unassigned) - 1, -1, -1):
+            variable: V = unassigned[index]
+            values: List[D] = domains[variable]
+            if propagation == "none":
+                values = self.legal_values(variable, assignment, values)
+            degree: int = 0
+            if variable_order == "mrv_degree":
+                degree = -sum(
+                    1 for n in self.neighbours(variable) if n not in assignment
+                )
+            key: Tuple[int, int] = (len(values), degree)
+            if best < 0 or key < best_key:
+                best, best_values, best_key = index, values, key
+                if not values:  # 已经无值可取， 不必再比较
+                    break
+        return best, best_values
+
+    def _order_values(
+        self,
+        variable: V,
+        values: List[D],
+        assignment: Dict[V, D],
+        domains: Dict[V, List[D]],
+    ) -> List[D]:
+        """
+        Docstring for _order_values
+        最少约束值: 按每个值会排除掉未赋值邻居多少个取值从小到大排序
+        """
+        neighbours: List[V] = [
+            n for n in self.neighbours(variable) if n not in assignment
+        ]
+        ruled_out: Dict[int, int] = {}
+        for position, value in enumerate(values):
+            assignment[variable] = value
+            count: int = 0
+            for neighbour in neighbours:
+                count += len(domains[neighbour]) - len(
+                    self.legal_values(neighbour, assignment, domains[neighbour])
+                )
+            ruled_out[position] = count
+        assignment.pop(variable, None)
+        return [values[p] for p in sorted(ruled_out, key=ruled_out.__getitem__)]
+
+    def _forward_check(
+        self,
+        variable: V,
+        assignment: Dict[V, D],
+        domains: Dict[V, List[D]],
+        trail: List[Tuple[V, List[D]]],
+    ) -> Optional[List[V]]:
+        """
+        Docstring for _forward_check
+        前向检查: variable 赋值后， 删去其未赋值邻居中已经与当前赋值冲突的值
+        被替换掉的旧值域记在 trail 上， 回溯时原样放回
+
+        :return: 值域被缩小的变量， 某个邻居值域为空时返回 None
+        :rtype: List[V] | None
+        """
+        pruned: List[V] = []
+        for neighbour in self.neighbours(variable):
+            if neighbour in assignment:
+                continue
+            values: List[D] = domains[neighbour]
+            legal: List[D] = self.legal_values(neighbour, assignment, values)
+            if len(legal) != len(values):
+                trail.append((neighbour, values))
+                domains[neighbour] = legal
+                if not legal:
+                    return None
+                pruned.append(neighbour)
+        return pruned
+
+    def _revise(self, xi: V, xj: V, domains: Dict[V, List[D]]) -> Optional[List[D]]:
+        """
+        Docstring for _revise
+        删去 xi 中在 xj 的值域里找不到支持的值
+
+        :return: 缩小后的值域， 没有变化时返回 None
+        :rtype: List[D] | None
+        """
+        constraints: List[Constraint[V, D]] = self.binary[xi][xj]
+        supported: List[D] = []
+        for a in domains[xi]:
+            for b in domains[xj]:
+                pair: Dict[V, D] = {xi: a, xj: b}
+                if all(c.satisfiled(pair) for c in constraints):
+                    supported.append(a)
+                    break
+        if len(supported) == len(domains[xi]):
+            return None
+        return supported
+
+    def _arc_consistency(
+        self,
+        arcs: List[Tuple[V, V]],
+        assignment: Dict[V, D],
+        domains: Dict[V, List[D]],
+        trail: List[Tuple[V, List[D]]],
+    ) -> bool:
+        """
+        Docstring for _arc_consistency
+        AC-3， 只处理未赋值变量之间的二元约束
+        (已赋值变量与邻居之间的约束由前向检查负责)
+
+        :param arcs: 待检查的弧 (xi, xj)
+        :type arcs: List[Tuple[V, V]]
+        :return: 某个值域被删空时返回 False
+        :rtype: bool
+        """
+        queue: Deque[Tuple[V, V]] = deque(arcs)
+        queued: Set[Tuple[V, V]] = set(arcs)
+        while queue:
+            arc: Tuple[V, V] = queue.popleft()
+            queued.discard(arc)
+            xi, xj = arc
+            revised: Optional[List[D]] = self._revise(xi, xj, domains)
+            if revised is None:
+                continue
+            trail.append((xi, domains[xi]))
+            domains[xi] = revised
+            if not revised:
+                return False
+            for xk in self.binary[xi]:
+                if xk != xj and xk not in assignment and (xk, xi) not in queued:
+                    queue.append((xk, xi))
+                    queued.add((xk, xi))
+        return True
+
+    def _arcs_into(
+        self, variables: List[V], assignment: Dict[V, D]
+    ) -> List[Tuple[V, V]]:
+        # 指向 variables 的所有弧 (xk, xj)， 两端都未赋值
+        return [
+            (xk, xj)
+            for xj in variables
+            for xk in self.binary.get(xj, {})
+            if xk not in assignment
+        ]
+
+    def _propagate(
+        self,
+        variable: V,
+        assignment: Dict[V, D],
+        domains: Dict[V, List[D]],
+        trail: List[Tuple[V, List[D]]],
+        propagation: str,
+    ) -> bool:
+        pruned: Optional[List[V]] = self._forward_check(
+            variable, assignment, domains, trail
+        )
+        if pruned is None:
+            return False
+        if propagation == "mac":
+            # 维护弧相容: 只需要重新检查指向被缩小值域的弧
+            return self._arc_consistency(
+                self._arcs_into(pruned, assignment), assignment, domains, trail
+            )
+        return True
+
+    @staticmethod
+    def _undo(
+        domains: Dict[V, List[D]], trail: List[Tuple[V, List[D]]], mark: int
+    ) -> None:
+        # 按相反顺序放回旧值域， 直到 trail 恢复到 mark 的长度
+        while len(trail) > mark:
+            variable, values = trail.pop()
+            domains[variable] = values
+
+    def backtracking_search(
+        self,
+        assignment: Optional[Dict[V, D]] = None,
+        variable_order: str = "first",
+        value_order: str = "domain",
+        propagation: str = "none",
+        backjump: bool = False,
+        nogood_limit: int = 0,
+    ) -> Optional[Dict[V, D]]:
         """
         Docstring for backtracking_search
         回溯思路如下： 一旦在搜索中碰到障碍， 就会回到碰到障碍之前最后一次做出判断的已知点
         然后选择其他一条路径。 类似深度优先搜索
+        用显式的栈代替递归， 在同一个 assignment 上原地赋值和撤销， 问题规模不受递归深度限制
 
         :param self: Description
-        :param assignment: 首次调用时为空, 通过递归过程中增加
-        :type assignment: Dict[V, D]
+        :param assignment: 已经确定的部分赋值， 不会被修改
+        :type assignment: Dict[V, D] | None
+        :param variable_order: 变量选择顺序， 见 VARIABLE_ORDERS
+        :type variable_order: str
+        :param value_order: 值选择顺序， 见 VALUE_ORDERS
+        :type value_order: str
+        :param propagation: 约束传播方式， 见 PROPAGATIONS
+        :type propagation: str
+        :param backjump: 是否使用冲突导向回跳 (conflict-directed backjumping)，
+            失败时直接跳回冲突集中最近赋值的变量， 只支持 propagation="none"
+        :type backjump: bool
+        :param nogood_limit: 大于 0 时记录最多这么多条 nogood (不可能扩展为解的部分赋值)，
+            按 LRU 淘汰， 需要 backjump， 并且值需要可哈希
+        :type nogood_limit: int
         :return: Description
         :rtype: Dict[V, D] | None
         """
-        # 递归搜索的基线条件是， 每个变量都能找到满足条件的赋值， 一旦找到就会返回满足条件的解的第一个实例，而不会继续搜索下去
-        if len(assignment) == len(self.variables):
-            return assignment
-
-        # 为了选出一个新变量来探索其值域， 只需遍历所有变量并找出第一个未赋值的变量
-        unassigned: List[V] = [v for v in self.variables if v not in assignment]
-        first: V = unassigned[0]
-
-        # 尝试为该变量赋予所有可能的域值
-        for value in self.domains[first]:
-            local_assignment = assignment.copy()
-            local_assignment[first] = value
-            if self.consistent(first, local_assignment):  # 类似 successors
-                result: Optional[Dict[V, D]] = self.backtracking_search(
-                    local_assignment
+        return next(
+            self._search(
+                assignment,
+                variable_order,
+                value_order,
+                propagation,
+                backjump=backjump,
+                nogood_limit=nogood_limit,
+            ),
+            None,
+        )
+
+    def _search(
+        self,
+        assignment: Optional[Dict[V, D]],
+        variable_order: str,
+        value_order: str,
+        propagation: str,
+        stop: Optional[Callable[[], bool]] = None,
+        break_symmetry: bool = False,
+        copy: bool = True,
+        backjump: bool = False,
+        nogood_limit: int = 0,
+    ) -> Iterator[Dict[V, D]]:
+        """
+        Docstring for _search
+        依次产生每一个解 (各自独立的 dict)， backtracking_search 只取第一个
+        stop 返回 True 时提前结束， 并行求解时用来取消其他进程中的搜索
+        copy 为 False 时产生的是搜索内部正在使用的 assignment， 只能在下一次迭代前读取
+        """
+        if variable_order not in VARIABLE_ORDERS:
+            raise ValueError("Unknown variable order: {}".format(variable_order))
+        if value_order not in VALUE_ORDERS:
+            raise ValueError("Unknown value order: {}".format(value_order))
+        if propagation not in PROPAGATIONS:
+            raise ValueError("Unknown propagation: {}".format(propagation))
+        if backjump and propagation != "none":
+            raise ValueError("Backjumping only supports propagation='none'.")
+        if nogood_limit > 0 and not backjump:
+            raise ValueError("The nogood store requires backjump=True.")
+        assignment = {} if assignment is None else dict(assignment)
+        # 未赋值变量只在开始时计算一次， 之后在搜索中增量维护
+        unassigned: List[V] = [
+            v for v in reversed(self.variables) if v not in assignment
+        ]
+        domains: Dict[V, List[D]] = self.domains
+        trail: List[Tuple[V, List[D]]] = []
+        if propagation != "none":
+            # 约束传播会修改值域， 在副本上进行， self.domains 保持不变
+            domains = {v: self.legal_values(v, assignment) for v in unassigned}
+            if any(not values for values in domains.values()):
+                return
+            if propagation in ("ac3", "mac") and not self._arc_consistency(
+                self._arcs_into(unassigned, assignment), assignment, domains, trail
+            ):
+                return
+            # 预处理的结果不需要撤销
+            trail.clear()
+
+        ranks: Dict[V, Dict[D, int]] = {}
+        if break_symmetry:
+            ranks = self._value_index()
+
+        store: Optional[_NogoodStore[V, D]] = None
+        if nogood_limit > 0:
+            store = _NogoodStore(nogood_limit)
+        # 已赋值变量在栈中的深度， 只包含搜索中赋值的变量
+        depth: Dict[V, int] = {}
+
+        stack: List[_Frame[V, D]] = []
+        descend: bool = True
+        steps: int = 0
+        while True:
+            steps += 1
+            if stop is not None and steps % 1024 == 0 and stop():
+                return
+            if descend:
+                # 每个变量都找到了满足条件的赋值， 产生一个解后继续回溯寻找下一个
+                if not unassigned:
+                    yield dict(assignment) if copy else assignment
+                    if not stack:
+                        return
+                    # 找到解之后要按时间顺序回溯， 把所有变量都算作冲突
+                    stack[-1].conflicts.update(depth)
+                    stack[-1].conflicts.discard(stack[-1].variable)
+                    descend = False
+            if descend:
+                index, values = self._select_variable(
+                    assignment, unassigned, domains, variable_order, propagation
                 )
+                # 把选中的变量换到末尾再弹出， 回溯时按相反顺序放回， unassigned 保持原样
+                unassigned[index], unassigned[-1] = unassigned[-1], unassigned[index]
+                variable: V = unassigned.pop()
+                if backjump:
+                    # mrv 预先筛掉的值也要逐个失败一次， 才能把原因记入冲突集
+                    values = domains[variable]
+                if value_order == "lcv":
+                    values = self._order_values(variable, values, assignment, domains)
+                depth[variable] = len(stack)
+                stack.append(_Frame(variable, index, values, len(trail)))
+
+            frame: _Frame[V, D] = stack[-1]
+            # 从子节点回溯到这里: 撤销这一层上次的赋值和值域修改
+            if frame.variable in assignment:
+                del assignment[frame.variable]
+                self._undo(domains, trail, frame.mark)
+
+            # 尝试为该变量赋予剩下的域值
+            descend = False
+            while frame.position < len(frame.values):
+                value: D = frame.values[frame.position]
+                frame.position += 1
+                assignment[frame.variable] = value
+                culprits: Optional[Iterable[V]] = None
+                if break_symmetry and not self._lex_leader(assignment, ranks):
+                    culprits = depth
+                elif propagation == "none":
+                    if backjump:
+                        violated: Optional[Constraint[V, D]] = self._violated(
+                            frame.variable, assignment
+                        )
+                        if violated is not None:
+                            culprits = violated.variables
+                        elif store is not None:
+                            culprits = store.match(frame.variable, value, assignment)
+                        descend = culprits is None
+                    else:
+                        descend = self.consistent(frame.variable, assignment)
+                else:
+                    # 传播后 domains 中的值都与已有赋值相容， 不需要再调用 consistent
+                    descend = self._propagate(
+                        frame.variable, assignment, domains, trail, propagation
+                    )
+                if descend:
+                    break
+                if culprits is not None:
+                    # 冲突集: 导致这个值失败的、 更早赋值的变量
+                    frame.conflicts.update(
+                        v for v in culprits if v in depth and v != frame.variable
+                    )
+                del assignment[frame.variable]
+                self._undo(domains, trail, frame.mark)
+
+            if descend:
+                continue
+            # 这一层的值都试过了， 放回变量并回到上一层
+            self._pop_frame(stack, unassigned, depth)
+            if backjump:
+                conflicts: Set[V] = frame.conflicts
+                if store is not None:
+                    # 冲突集上的赋值不可能扩展为解， 以后不再尝试
+                    store.add([(v, assignment[v]) for v in conflicts])
+                # 直接跳回冲突集中最近赋值的变量， 中间各层不可能修复这个冲突
+                while stack and stack[-1].variable not in conflicts:
+                    skipped: _Frame[V, D] = stack[-1]
+                    del assignment[skipped.variable]
+                    self._undo(domains, trail, skipped.mark)
+                    self._pop_frame(stack, unassigned, depth)
+                if stack:
+                    stack[-1].conflicts.update(conflicts)
+                    stack[-1].conflicts.discard(stack[-1].variable)
+            if not stack:
+                return
+
+    @staticmethod
+    def _pop_frame(
+        stack: List[_Frame[V, D]], unassigned: List[V], depth: Dict[V, int]
+    ) -> None:
+        # 弹出栈顶一层， 把它的变量放回 unassigned 中原来的位置
+        frame: _Frame[V, D] = stack.pop()
+        del depth[frame.variable]
+        unassigned.append(frame.variable)
+        unassigned[frame.index], unassigned[-1] = (
+            unassigned[-1],
+            unassigned[frame.index],
+        )
+
+    def _violated(
+        self, variable: V, assignment: Dict[V, D]
+    ) -> Optional[Constraint[V, D]]:
+        # 与 consistent 相同， 但返回第一个不满足的约束， 用来确定冲突集
+        for constraint in self.constraints[variable]:
+            if not constraint.satisfiled(assignment):
+                return constraint
+        return None
+
+    def solutions(
+        self,
+        assignment: Optional[Dict[V, D]] = None,
+        variable_order: str = "first",
+        value_order: str = "domain",
+        propagation: str = "none",
+        break_symmetry: bool = False,
+        backjump: bool = False,
+        nogood_limit: int = 0,
+    ) -> Iterator[Dict[V, D]]:
+        """
+        Docstring for solutions
+        按需逐个产生所有解， 不需要一次把所有解放进内存
+
+        :param break_symmetry: 是否只产生每个对称等价类中的一个解， 见 add_symmetry
+        :type break_symmetry: bool
+        :param backjump: 见 backtracking_search
+        :type backjump: bool
+        :param nogood_limit: 见 backtracking_search
+        :type nogood_limit: int
+        :return: 解的迭代器
+        :rtype: Iterator[Dict[V, D]]
+        """
+        return self._search(
+            assignment,
+            variable_order,
+            value_order,
+            propagation,
+            break_symmetry=break_symmetry,
+            backjump=backjump,
+            nogood_limit=nogood_limit,
+        )
+
+    def count_solutions(
+        self,
+        assignment: Optional[Dict[V, D]] = None,
+        variable_order: str = "first",
+        value_order: str = "domain",
+        propagation: str = "none",
+        break_symmetry: bool = False,
+        expand: bool = True,
+        backjump: bool = False,
+        nogood_limit: int = 0,
+    ) -> int:
+        """
+        Docstring for count_solutions
+        只计数的全部解搜索， 不为每个解复制 assignment
+        break_symmetry 时只搜索每个等价类中的代表解;
+        expand 为 True 时再把代表解所在等价类的大小加起来， 得到与不破缺时相同的总数
+
+        :param break_symmetry: 是否使用声明的对称性剪枝
+        :type break_symmetry: bool
+        :param expand: 是否把代表解换算为等价类大小， 否则返回等价类个数
+        :type expand: bool
+        :param backjump: 见 backtracking_search
+        :type backjump: bool
+        :param nogood_limit: 见 backtracking_search
+        :type nogood_limit: int
+        :return: 解的个数
+        :rtype: int
+        """
+        found: Iterator[Dict[V, D]] = self._search(
+            assignment,
+            variable_order,
+            value_order,
+            propagation,
+            break_symmetry=break_symmetry,
+            copy=False,
+            backjump=backjump,
+            nogood_limit=nogood_limit,
+        )
+        if not (break_symmetry and expand):
+            return sum(1 for _ in found)
+
+        index: Dict[V, Dict[D, int]] = self._value_index()
+
+        def order(solution: Dict[V, D]) -> Tuple[int, ...]:
+            return tuple(index[v][solution[v]] for v in self.variables)
+
+        total: int = 0
+        for solution in found:
+            orbit: List[Dict[V, D]] = self._orbit(solution)
+            # 只声明了部分对称时一个等价类可能有多个代表， 只让字典序最小的那个计数
+            if order(solution) == min(order(image) for image in orbit):
+                total += len(orbit)
+        return total
+
+    def split(
+        self, assignment: Optional[Dict[V, D]] = None, depth: int = 1
+    ) -> List[Dict[V, D]]:
+        """
+        Docstring for split
+        把搜索空间切分成互不重叠的子问题:
+        按声明顺序取前 depth 个未赋值变量， 枚举它们所有相容的取值组合
+        depth 越大子问题越多、 越小， 各进程之间的负载也越均衡
+
+        :param assignment: 已经确定的部分赋值
+        :type assignment: Dict[V, D] | None
+        :param depth: 展开的变量个数
+        :type depth: int
+        :return: 子问题 (部分赋值) 列表
+        :rtype: List[Dict[V, D]]
+        """
+        partials: List[Dict[V, D]] = [{} if assignment is None else dict(assignment)]
+        free: List[V] = [v for v in self.variables if v not in partials[0]]
+        for variable in free[:depth]:
+            expanded: List[Dict[V, D]] = []
+            for partial in partials:
+                for value in self.domains[variable]:
+                    candidate: Dict[V, D] = dict(partial)
+                    candidate[variable] = value
+                    if self.consistent(variable, candidate):
+                        expanded.append(candidate)
+            partials = expanded
+        return partials
+
+    def parallel_backtracking_search(
+        self,
+        assignment: Optional[Dict[V, D]] = None,
+        workers: Optional[int] = None,
+        depth: int = 1,
+        variable_order: str = "first",
+        value_order: str = "domain",
+        propagation: str = "none",
+    ) -> Optional[Dict[V, D]]:
+        """
+        Docstring for parallel_backtracking_search
+        用 split 切分出的子问题在进程池中并行搜索， 返回最先找到的解
+        一旦找到解就通知其他进程停止， 尚未开始的子问题直接取消
+        变量、 值域和约束都需要能被 pickle (模块级定义的 Constraint 子类即可)
+
+        :param workers: 进程数， None 表示使用 CPU 核心数
+        :type workers: int | None
+        :param depth: 切分深度， 见 split
+        :type depth: int
+        :return: 任意一个解， 不一定与 backtracking_search 的结果相同
+        :rtype: Dict[V, D] | None
+        """
+        options: Tuple[str, str, str] = (variable_order, value_order, propagation)
+        stop = Event()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_csp_worker,
+            initargs=(self, stop, options),
+        ) as executor:
+            futures: List[Future[Optional[Dict[V, D]]]] = [
+                executor.submit(_solve_first, partial)
+                for partial in self.split(assignment, depth)
+            ]
+            for future in as_completed(futures):
+                result: Optional[Dict[V, D]] = future.result()
                 if result is not None:
+                    stop.set()
+                    for other in futures:
+                        other.cancel()
                     return result
         return None
+
+    def parallel_all_solutions(
+        self,
+        assignment: Optional[Dict[V, D]] = None,
+        workers: Optional[int] = None,
+        depth: int = 1,
+        variable_order: str = "first",
+        value_order: str = "domain",
+        propagation: str = "none",
+    ) -> List[Dict[V, D]]:
+        """
+        Docstring for parallel_all_solutions
+        在进程池中求出每个子问题的全部解再合并， 结果按子问题的顺序排列
+
+        :param workers: 进程数， None 表示使用 CPU 核心数
+        :type workers: int | None
+        :param depth: 切分深度， 见 split
+        :type depth: int
+        :return: 所有解
+        :rtype: List[Dict[V, D]]
+        """
+        options: Tuple[str, str, str] = (variable_order, value_order, propagation)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_csp_worker,
+            initargs=(self, Event(), options),
+        ) as executor:
+            futures: List[Future[List[Dict[V, D]]]] = [
+                executor.submit(_solve_all, partial)
+                for partial in self.split(assignment, depth)
+            ]
+            return [solution for future in futures for solution in future.result()]
+
+
+_worker_csp: Optional[CSP[Any, Any]] = None
+_worker_stop: Any = None
+_worker_options: Tuple[str, str, str] = ("first", "domain", "none")
+
+
+def _init_csp_worker(
+    csp: CSP[Any, Any], stop: Any, options: Tuple[str, str, str]
+) -> None:
+    """
+    进程池初始化函数， 每个工作进程只接收一次 CSP 和停止信号
+    """
+    global _worker_csp, _worker_stop, _worker_options
+    _worker_csp = csp
+    _worker_stop = stop
+    _worker_options = options
+
+
+def _solve_first(assignment: Dict[Any, Any]) -> Optional[Dict[Any, Any]]:
+    assert _worker_csp is not None
+    if _worker_stop.is_set():
+        return None
+    return next(
+        _worker_csp._search(assignment, *_worker_options, stop=_worker_stop.is_set),
+        None,
+    )
+
+
+def _solve_all(assignment: Dict[Any, Any]) -> List[Dict[Any, Any]]:
+    assert _worker_csp is not None
+    return list(_worker_csp._search(assignment, *_worker_options))
@@ -11,12 +11,31 @@ from typing import (
     Dict,
     Optional,
     Protocol,
+    Tuple,
+    Iterator,
+    Generator,
+    BinaryIO,
 )
 
-from heapq import heappush, heappop
+from heapq import heappush, heappop, merge
+from bisect import bisect_left
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic, perf_counter
+from threading import Event
+import asyncio
+from tempfile import TemporaryDirectory
+from struct import Struct
+import os
+import pickle
+from collections import OrderedDict
+from math import inf, log
 
 T = TypeVar("T")
 
+# external_bfs 记录文件中每条记录的头部: 状态编码长度, 父状态编码长度
+_RECORD_HEADER: Struct = Struct("<II")
+
 
 class Stack(Generic[T]):
     """
@@ -37,6 +56,9 @@ class Stack(Generic[T]):
     def pop(self) -> T:
         return self._container.pop()
 
+    def __len__(self) -> int:
+        return len(self._container)
+
     def __repr__(self) -> str:
         return repr(self._container)
 
@@ -55,6 +77,9 @@ class Queue(Generic[T]):
     def pop(self) -> T:
         return self._container.popleft()
 
+    def __len__(self) -> int:
+        return len(self._container)
+
     def __repr__(self) -> str:
         return repr(self._container)
 
@@ -79,6 +104,12 @@ class PriorityQueue(Generic[T]):
     def pop(self) -> T:
         return heappop(self._container)
 
+    def peek(self) -> T:
+        return self._container[0]
+
+    def __len__(self) -> int:
+        return len(self._container)
+
     def __repr__(self) -> str:
         return repr(self._container)
 
@@ -100,8 +131,11 @@ class Node(Generic[T]):
     cost, heuristic 用于 A* 算法中
     heappush heappop 使用 < 小于操作符进行比较 所以需要实现 __lt__
     f(n) 简单地将 cost 和 heuristic 属性相加
+    __slots__ 去掉了每个实例的 __dict__， 大规模搜索时能明显减少内存
     """
 
+    __slots__ = ("state", "parent", "cost", "heuristic")
+
     def __init__(
         self,
         state: T,
@@ -118,8 +152,396 @@ class Node(Generic[T]):
         return (self.cost + self.heuristic) < (other.cost + other.heuristic)
 
 
+class NodeStore(Generic[T]):
+    """
+    Docstring for NodeStore
+    紧凑的节点存储
+    每个状态被分配一个整数 id， 父节点 id 和 g(n) 分别存放在 array 实现的列中
+    搜索时 frontier 只需保存 int 或 (f, g, id) 元组， 不必为每次扩展创建 Node 对象
+
+    _ids: 状态 -> id
+    _states: id -> 状态
+    _parents: id -> 父节点 id， 起点为 -1
+    _costs: id -> g(n)
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[T, int] = {}
+        self._states: List[T] = []
+        self._parents: array[int] = array("q")
+        self._costs: array[float] = array("d")
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, state: T) -> bool:
+        return state in self._ids
+
+    def add(self, state: T, parent: int = -1, cost: float = 0.0) -> int:
+        """
+        记录一个新状态并返回其 id， 状态已存在时抛出 KeyError
+        """
+        if state in self._ids:
+            raise KeyError("State already in store.")
+        index: int = len(self._states)
+        self._ids[state] = index
+        self._states.append(state)
+        self._parents.append(parent)
+        self._costs.append(cost)
+        return index
+
+    def id_of(self, state: T) -> Optional[int]:
+        return self._ids.get(state)
+
+    def state(self, index: int) -> T:
+        return self._states[index]
+
+    def parent(self, index: int) -> int:
+        return self._parents[index]
+
+    def cost(self, index: int) -> float:
+        return self._costs[index]
+
+    def update(self, index: int, parent: int, cost: float) -> None:
+        """
+        找到更优路径时改写父节点和 g(n)
+        """
+        self._parents[index] = parent
+        self._costs[index] = cost
+
+    def path(self, index: int) -> List[T]:
+        """
+        与 node_to_path 相同， 沿父节点 id 回溯得到起点到该状态的路径
+        """
+        path: List[T] = []
+        while index != -1:
+            path.append(self._states[index])
+            index = self._parents[index]
+        path.reverse()
+        return path
+
+    def to_node(self, index: int) -> Node[T]:
+        """
+        把 id 还原成 Node 链， 供只接受 Node 的已有调用方使用
+        """
+        indices: List[int] = []
+        while index != -1:
+            indices.append(index)
+            index = self._parents[index]
+        node: Optional[Node[T]] = None
+        for i in reversed(indices):
+            node = Node(self._states[i], node, self._costs[i])
+        assert node is not None
+        return node
+
+
+class Frontier(Protocol[T]):
+    """
+    dfs / bfs / astar 使用的 frontier 需要支持的操作， Stack / Queue / PriorityQueue 都满足
+    """
+
+    @property
+    def empty(self) -> bool: ...
+    def push(self, item: T) -> None: ...
+    def pop(self) -> T: ...
+    def __len__(self) -> int: ...
+
+
+class SearchStats:
+    """
+    Docstring for SearchStats
+    可选的搜索统计， 把实例通过 stats 参数传给 dfs / bfs / astar / weighted_astar 即可开启
+    不传时各搜索函数只多出每次扩展一次 `stats is not None` 的判断， 几乎没有额外开销
+
+    expanded: 从 frontier 中弹出的节点数
+    generated: successors 产生的后继总数
+    duplicates: 被丢弃 (已探索或代价不更优) 的后继数
+    peak_frontier: frontier 的最大长度
+    explored_size: explored 的大小
+    heuristic_calls: 启发函数调用次数
+    successor_time / queue_time: 花在 successors 与 frontier 入队出队上的时间 (秒)
+    wall_time: 搜索总耗时 (秒)
+    hooks: 每次扩展时调用 hook(state, stats)， 用于把进度推送到外部监控
+    """
+
+    def __init__(
+        self, hooks: Optional[List[Callable[[Any, "SearchStats"], None]]] = None
+    ) -> None:
+        self.expanded: int = 0
+        self.generated: int = 0
+        self.pushed: int = 0
+        self.peak_frontier: int = 0
+        self.explored_size: int = 0
+        self.heuristic_calls: int = 0
+        self.successor_time: float = 0.0
+        self.queue_time: float = 0.0
+        self.wall_time: float = 0.0
+        self.hooks: List[Callable[[Any, "SearchStats"], None]] = hooks or []
+        self._start: float = 0.0
+
+    @property
+    def duplicates(self) -> int:
+        # 起点也经过一次入队， 不计入 generated
+        return self.generated - (self.pushed - 1)
+
+    def watch(
+        self, frontier: Frontier[Any], successors: Callable[[T], Iterable[Any]]
+    ) -> Tuple[Frontier[Any], Callable[[T], List[Any]]]:
+        """
+        开始计时， 返回计时版的 frontier 和 successors， 搜索函数改用它们
+        必须在起点入队之前调用
+        """
+        self._start = perf_counter()
+
+        def timed_successors(state: T) -> List[Any]:
+            begin: float = perf_counter()
+            children: List[Any] = list(successors(state))
+            self.successor_time += perf_counter() - begin
+            self.generated += len(children)
+            return children
+
+        return _WatchedFrontier(frontier, self), timed_successors
+
+    def watch_heuristic(self, heuristic: Callable[[T], float]) -> Callable[[T], float]:
+        def counted(state: T) -> float:
+            self.heuristic_calls += 1
+            return heuristic(state)
+
+        return counted
+
+    def expand(self, state: Any, explored_size: int) -> None:
+        """
+        每次从 frontier 弹出节点后调用
+        """
+        self.expanded += 1
+        self.explored_size = explored_size
+        self.wall_time = perf_counter() - self._start
+        for hook in self.hooks:
+            hook(state, self)
+
+    def finish(self, explored_size: int) -> None:
+        """
+        搜索结束 (找到目标或 frontier 耗尽) 时调用
+        """
+        self.explored_size = explored_size
+        self.wall_time = perf_counter() - self._start
+
+    def __repr__(self) -> str:
+        return (
+            "SearchStats(expanded={}, generated={}, duplicates={}, peak_frontier={}, "
+            "explored_size={}, heuristic_calls={}, successor_time={:.6f}, "
+            "queue_time={:.6f}, wall_time={:.6f})"
+        ).format(
+            self.expanded,
+            self.generated,
+            self.duplicates,
+            self.peak_frontier,
+            self.explored_size,
+            self.heuristic_calls,
+            self.successor_time,
+            self.queue_time,
+            self.wall_time,
+        )
+
+
+class _WatchedFrontier(Generic[T]):
+    """
+    SearchStats.watch 返回的 frontier 包装， 给 push / pop 计时并记录 frontier 的最大长度
+    """
+
+    def __init__(self, frontier: Frontier[T], stats: SearchStats) -> None:
+        self._frontier: Frontier[T] = frontier
+        self._stats: SearchStats = stats
+
+    @property
+    def empty(self) -> bool:
+        return self._frontier.empty
+
+    def push(self, item: T) -> None:
+        begin: float = perf_counter()
+        self._frontier.push(item)
+        self._stats.queue_time += perf_counter() - begin
+        self._stats.pushed += 1
+        self._stats.peak_frontier = max(self._stats.peak_frontier, len(self._frontier))
+
+    def pop(self) -> T:
+        begin: float = perf_counter()
+        item: T = self._frontier.pop()
+        self._stats.queue_time += perf_counter() - begin
+        return item
+
+    def __len__(self) -> int:
+        return len(self._frontier)
+
+
+class ExploredSet(Protocol[T]):
+    """
+    dfs / bfs 使用的 explored 结构需要支持的操作， 内置的 set 即满足
+    """
+
+    def add(self, item: T) -> None: ...
+    def __contains__(self, item: object) -> bool: ...
+    def __len__(self) -> int: ...
+
+
+class CostMap(Protocol[T]):
+    """
+    astar 使用的 explored 结构 (状态 -> 已知最小代价) 需要支持的操作， 内置的 dict 即满足
+    """
+
+    def __contains__(self, item: object) -> bool: ...
+    def __getitem__(self, item: T) -> float: ...
+    def __setitem__(self, item: T, cost: float) -> None: ...
+    def __len__(self) -> int: ...
+
+
+class DenseBitset(Generic[T]):
+    """
+    Docstring for DenseBitset
+    状态能编码为 0 ~ size-1 的整数时 (例如 MazeLocation -> row * columns + column)，
+    用 bytearray 中的一个比特表示是否已探索
+    不保存状态对象本身， 也不需要对状态求哈希， 内存只有 size / 8 字节
+    """
+
+    def __init__(self, size: int, encode: Callable[[T], int]) -> None:
+        self._bits: bytearray = bytearray((size + 7) // 8)
+        self._encode: Callable[[T], int] = encode
+        self._count: int = 0
+
+    def add(self, item: T) -> None:
+        index: int = self._encode(item)
+        mask: int = 1 << (index & 7)
+        if not self._bits[index >> 3] & mask:
+            self._bits[index >> 3] |= mask
+            self._count += 1
+
+    def __contains__(self, item: Any) -> bool:
+        index: int = self._encode(item)
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class DenseCostMap(Generic[T]):
+    """
+    Docstring for DenseCostMap
+    DenseBitset 的 astar 版本， 用 array("d") 按编码保存每个状态的代价， inf 表示未探索
+    """
+
+    def __init__(self, size: int, encode: Callable[[T], int]) -> None:
+        self._costs: array[float] = array("d", [inf]) * size
+        self._encode: Callable[[T], int] = encode
+        self._count: int = 0
+
+    def __contains__(self, item: Any) -> bool:
+        return self._costs[self._encode(item)] != inf
+
+    def __getitem__(self, item: T) -> float:
+        cost: float = self._costs[self._encode(item)]
+        if cost == inf:
+            raise KeyError(item)
+        return cost
+
+    def __setitem__(self, item: T, cost: float) -> None:
+        index: int = self._encode(item)
+        if self._costs[index] == inf:
+            self._count += 1
+        self._costs[index] = cost
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class InternedSet(Generic[T]):
+    """
+    Docstring for InternedSet
+    适用于无法直接编码为整数的状态
+    第一次遇到某个状态时为它分配一个整数 id， 是否已探索记录在按 id 索引的 bytearray 中
+    clear() 只清空标记而保留 id， 在同一状态空间上反复搜索时不必重新哈希和分配
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[T, int] = {}
+        self._flags: bytearray = bytearray()
+        self._count: int = 0
+
+    def intern(self, item: T) -> int:
+        index: Optional[int] = self._ids.get(item)
+        if index is None:
+            index = len(self._ids)
+            self._ids[item] = index
+            self._flags.append(0)
+        return index
+
+    def add(self, item: T) -> None:
+        index: int = self.intern(item)
+        if not self._flags[index]:
+            self._flags[index] = 1
+            self._count += 1
+
+    def __contains__(self, item: Any) -> bool:
+        index: Optional[int] = self._ids.get(item)
+        return index is not None and bool(self._flags[index])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        self._flags = bytearray(len(self._flags))
+        self._count = 0
+
+
+class BloomFilter(Generic[T]):
+    """
+    Docstring for BloomFilter
+    近似的 explored， 适用于巨大的状态空间
+    用 k 个哈希位置表示一个状态， 内存只与 capacity 和 error_rate 有关， 与状态大小无关
+    不会漏判已探索的状态， 但有 error_rate 左右的概率把未探索的状态误判为已探索，
+    因此搜索可能跳过少量状态， 在只需要 "足够好" 的结果时使用
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        bits: int = max(8, int(-capacity * log(error_rate) / (log(2) ** 2)))
+        self._size: int = bits
+        self._hashes: int = max(1, round(bits / capacity * log(2)))
+        self._bits: bytearray = bytearray((bits + 7) // 8)
+        self._count: int = 0
+
+    def _positions(self, item: Any) -> Iterator[int]:
+        # 双重哈希: 第 i 个位置为 h1 + i * h2
+        h1: int = hash(item)
+        h2: int = hash((item, 0x9E3779B9)) | 1
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._size
+
+    def add(self, item: T) -> None:
+        added: bool = False
+        for position in self._positions(item):
+            mask: int = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self._count += 1
+
+    def __contains__(self, item: Any) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        # 近似值: 插入时至少置位了一个新比特的状态数
+        return self._count
+
+
 def dfs(
-    initial: T, goal_test: Callable[[T], bool], successors: Callable[[T], List[T]]
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    stats: Optional[SearchStats] = None,
+    explored: Optional[ExploredSet[T]] = None,
 ) -> Optional[Node[T]]:
     """
     Docstring for dfs
@@ -143,17 +565,29 @@ def dfs(
     :type goal_test: Callable[[T], bool]
     :param successors: Description
     :type successors: Callable[[T], List[T]]
+    :param stats: 传入时记录搜索统计
+    :type stats: SearchStats | None
+    :param explored: explored 的存储结构， 默认为 set， 也可以是 DenseBitset / InternedSet / BloomFilter
+    :type explored: ExploredSet[T] | None
     :return: Description
     :rtype: Node[T] | None
     """
-    frontier: Stack[Node[T]] = Stack()
+    frontier: Frontier[Node[T]] = Stack()
+    if stats is not None:
+        frontier, successors = stats.watch(frontier, successors)
     frontier.push(Node(initial, None))
-    explored: Set[T] = {initial}
+    if explored is None:
+        explored = set()
+    explored.add(initial)
 
     while not frontier.empty:
         current_node: Node[T] = frontier.pop()
         current_state: T = current_node.state
+        if stats is not None:
+            stats.expand(current_state, len(explored))
         if goal_test(current_state):
+            if stats is not None:
+                stats.finish(len(explored))
             return current_node
 
         for child in successors(current_state):
@@ -161,11 +595,17 @@ def dfs(
                 continue
             explored.add(child)
             frontier.push(Node(child, current_node))
+    if stats is not None:
+        stats.finish(len(explored))
     return None
 
 
 def bfs(
-    initial: T, goal_test: Callable[[T], bool], successors: Callable[[T], List[T]]
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    stats: Optional[SearchStats] = None,
+    explored: Optional[ExploredSet[T]] = None,
 ) -> Optional[Node[T]]:
     """
     Docstring for bfs
@@ -177,23 +617,37 @@ def bfs(
     :type goal_test: Callable[[T], bool]
     :param successors: Description
     :type successors: Callable[[T], List[T]]
+    :param stats: 传入时记录搜索统计
+    :type stats: SearchStats | None
+    :param explored: explored 的存储结构， 默认为 set， 也可以是 DenseBitset / InternedSet / BloomFilter
+    :type explored: ExploredSet[T] | None
     :return: Description
     :rtype: Node[T] | None
     """
-    frontier: Queue[Node[T]] = Queue()
+    frontier: Frontier[Node[T]] = Queue()
+    if stats is not None:
+        frontier, successors = stats.watch(frontier, successors)
     frontier.push(Node(initial, None))
-    explored: Set[T] = {initial}
+    if explored is None:
+        explored = set()
+    explored.add(initial)
 
     while not frontier.empty:
         current_node: Node[T] = frontier.pop()
         current_state = current_node.state
+        if stats is not None:
+            stats.expand(current_state, len(explored))
         if goal_test(current_state):
+            if stats is not None:
+                stats.finish(len(explored))
             return current_node
         for child in successors(current_state):
             if child in explored:
                 continue
-            explored.add(current_state)
+            explored.add(child)
             frontier.push(Node(child, current_node))
+    if stats is not None:
+        stats.finish(len(explored))
     return None
 
 
@@ -202,6 +656,8 @@ def astar(
     goal_test: Callable[[T], bool],
     successors: Callable[[T], List[T]],
     heuristic: Callable[[T], float],
+    stats: Optional[SearchStats] = None,
+    explored: Optional[CostMap[T]] = None,
 ) -> Optional[Node[T]]:
     """
     Docstring for astar
@@ -224,18 +680,31 @@ def astar(
     :type successors: Callable[[T], List[T]]
     :param heuristic: Description
     :type heuristic: Callable[[T], float]
+    :param stats: 传入时记录搜索统计
+    :type stats: SearchStats | None
+    :param explored: 状态 -> 已知最小代价的存储结构， 默认为 dict， 也可以是 DenseCostMap
+    :type explored: CostMap[T] | None
     :return: Description
     :rtype: Node[T] | None
     """
-    frontier: PriorityQueue[Node[T]] = PriorityQueue()
+    frontier: Frontier[Node[T]] = PriorityQueue()
+    if stats is not None:
+        frontier, successors = stats.watch(frontier, successors)
+        heuristic = stats.watch_heuristic(heuristic)
     frontier.push(Node(initial, None, 0.0, heuristic(initial)))
-    explored: Dict[T, float] = {initial: 0.0}
+    if explored is None:
+        explored = {}
+    explored[initial] = 0.0
 
     while not frontier.empty:
         current_node: Node[T] = frontier.pop()
         current_state = current_node.state
+        if stats is not None:
+            stats.expand(current_state, len(explored))
 
         if goal_test(current_state):
+            if stats is not None:
+                stats.finish(len(explored))
             return current_node
 
         for child in successors(current_state):
@@ -243,9 +712,920 @@ def astar(
             if child not in explored or explored[child] > new_cost:
                 explored[child] = new_cost
                 frontier.push(Node(child, current_node, new_cost, heuristic(child)))
+    if stats is not None:
+        stats.finish(len(explored))
+    return None
+
+
+def weighted_astar(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], Iterable[Tuple[T, float]]],
+    heuristic: Callable[[T], float],
+    stats: Optional[SearchStats] = None,
+) -> Optional[Node[T]]:
+    """
+    Docstring for weighted_astar
+    支持带权边的 astar 搜索
+    successors 返回 (状态, 单步代价) 的二元组， 不再把每一跳的成本固定为 1
+
+    与 astar 的区别:
+    1. best_cost 记录每个状态当前已知的最小 g(n)， 从 frontier 弹出的节点若代价大于它， 说明是过期的条目， 直接跳过
+    2. closed 记录已经扩展过的状态， 在启发函数一致(consistent)时每个状态只扩展一次
+    3. frontier 中存放 (f, h, 序号, node)， f 相同时 h 较小者优先， 再按入队顺序， 保证结果确定
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 返回 (后继状态, 单步代价) 的函数
+    :type successors: Callable[[T], Iterable[Tuple[T, float]]]
+    :param heuristic: 启发函数 h(n)
+    :type heuristic: Callable[[T], float]
+    :param stats: 传入时记录搜索统计
+    :type stats: SearchStats | None
+    :return: 封装目标状态的 Node， cost 为路径总代价
+    :rtype: Node[T] | None
+    """
+    frontier: Frontier[Tuple[float, float, int, Node[T]]] = PriorityQueue()
+    if stats is not None:
+        frontier, successors = stats.watch(frontier, successors)
+        heuristic = stats.watch_heuristic(heuristic)
+    h: float = heuristic(initial)
+    counter: int = 0
+    frontier.push((h, h, counter, Node(initial, None, 0.0, h)))
+    best_cost: Dict[T, float] = {initial: 0.0}
+    closed: Set[T] = set()
+
+    while not frontier.empty:
+        current_node: Node[T] = frontier.pop()[3]
+        current_state: T = current_node.state
+        if current_state in closed or current_node.cost > best_cost[current_state]:
+            continue
+        if stats is not None:
+            stats.expand(current_state, len(closed))
+        if goal_test(current_state):
+            if stats is not None:
+                stats.finish(len(closed))
+            return current_node
+        closed.add(current_state)
+
+        for child, step_cost in successors(current_state):
+            if child in closed:
+                continue
+            new_cost: float = current_node.cost + step_cost
+            if child in best_cost and best_cost[child] <= new_cost:
+                continue
+            best_cost[child] = new_cost
+            h = heuristic(child)
+            counter += 1
+            frontier.push(
+                (new_cost + h, h, counter, Node(child, current_node, new_cost, h))
+            )
+    if stats is not None:
+        stats.finish(len(closed))
+    return None
+
+
+def ida_star(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    heuristic: Callable[[T], float],
+    table_size: int = 0,
+) -> Optional[Node[T]]:
+    """
+    Docstring for ida_star
+    迭代加深 A* 搜索 (IDA*)
+    以 f(n) = g(n) + h(n) 作为阈值做深度优先搜索， 超过阈值的分支被剪掉
+    一轮结束后把阈值提高到本轮被剪掉分支中最小的 f(n)， 再从头开始
+    不需要 astar 的 explored 和优先队列， 内存只与路径深度成正比
+
+    深度优先部分用显式栈 (节点, 后继迭代器) 实现， 不受递归深度限制
+    on_path 记录当前路径上的状态， 避免沿路径绕圈
+    table_size > 0 时启用有界置换表， 记录本轮内到达某状态的最小 g(n)，
+    以更大或相等的代价再次到达时直接剪枝， 超出容量按 LRU 淘汰
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数， 每一跳成本视为 1
+    :type successors: Callable[[T], List[T]]
+    :param heuristic: 启发函数 h(n)
+    :type heuristic: Callable[[T], float]
+    :param table_size: 置换表容量， 0 表示不使用置换表
+    :type table_size: int
+    :return: 封装目标状态的 Node
+    :rtype: Node[T] | None
+    """
+    root: Node[T] = Node(initial, None, 0.0, heuristic(initial))
+    if goal_test(initial):
+        return root
+    bound: float = root.heuristic
+    table: OrderedDict[T, float] = OrderedDict()
+
+    while True:
+        next_bound: float = inf
+        table.clear()
+        stack: List[Tuple[Node[T], Iterator[T]]] = [(root, iter(successors(initial)))]
+        on_path: Set[T] = {initial}
+
+        while stack:
+            current_node, children = stack[-1]
+            child: Optional[T] = next(children, None)
+            if child is None:
+                stack.pop()
+                on_path.discard(current_node.state)
+                continue
+            if child in on_path:
+                continue
+            new_cost: float = current_node.cost + 1
+            h: float = heuristic(child)
+            if new_cost + h > bound:
+                next_bound = min(next_bound, new_cost + h)
+                continue
+            if table_size > 0:
+                if child in table and table[child] <= new_cost:
+                    continue
+                table[child] = new_cost
+                table.move_to_end(child)
+                if len(table) > table_size:
+                    table.popitem(last=False)
+            child_node: Node[T] = Node(child, current_node, new_cost, h)
+            if goal_test(child):
+                return child_node
+            on_path.add(child)
+            stack.append((child_node, iter(successors(child))))
+
+        if next_bound == inf:
+            return None
+        bound = next_bound
+
+
+def compact_bfs(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    store: Optional[NodeStore[T]] = None,
+) -> Optional[Node[T]]:
+    """
+    Docstring for compact_bfs
+    使用 NodeStore 的 bfs， frontier 中只存放整数 id
+    NodeStore 本身兼作 explored， 找到目标后才还原成 Node 链
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数
+    :type successors: Callable[[T], List[T]]
+    :param store: 可传入空的 NodeStore， 搜索结束后可用其 path() 重建任意已访问状态的路径
+    :type store: NodeStore[T] | None
+    :return: 封装目标状态的 Node
+    :rtype: Node[T] | None
+    """
+    if store is None:
+        store = NodeStore()
+    frontier: Queue[int] = Queue()
+    frontier.push(store.add(initial))
+
+    while not frontier.empty:
+        current: int = frontier.pop()
+        current_state: T = store.state(current)
+        if goal_test(current_state):
+            return store.to_node(current)
+        cost: float = store.cost(current) + 1
+        for child in successors(current_state):
+            if child in store:
+                continue
+            frontier.push(store.add(child, current, cost))
+    return None
+
+
+def compact_astar(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    heuristic: Callable[[T], float],
+    store: Optional[NodeStore[T]] = None,
+) -> Optional[Node[T]]:
+    """
+    Docstring for compact_astar
+    使用 NodeStore 的 astar， frontier 中存放 (f, g, id) 元组
+    弹出条目的 g 大于存储中的 g(n)， 说明已有更优路径， 视为过期条目跳过
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数， 每一跳成本视为 1
+    :type successors: Callable[[T], List[T]]
+    :param heuristic: 启发函数 h(n)
+    :type heuristic: Callable[[T], float]
+    :param store: 可传入空的 NodeStore， 用于搜索结束后重建路径
+    :type store: NodeStore[T] | None
+    :return: 封装目标状态的 Node
+    :rtype: Node[T] | None
+    """
+    if store is None:
+        store = NodeStore()
+    frontier: PriorityQueue[Tuple[float, float, int]] = PriorityQueue()
+    frontier.push((heuristic(initial), 0.0, store.add(initial)))
+
+    while not frontier.empty:
+        _, g, current = frontier.pop()
+        if g > store.cost(current):
+            continue
+        current_state: T = store.state(current)
+        if goal_test(current_state):
+            return store.to_node(current)
+
+        new_cost: float = g + 1
+        for child in successors(current_state):
+            index: Optional[int] = store.id_of(child)
+            if index is None:
+                index = store.add(child, current, new_cost)
+            elif store.cost(index) > new_cost:
+                store.update(index, current, new_cost)
+            else:
+                continue
+            frontier.push((new_cost + heuristic(child), new_cost, index))
+    return None
+
+
+_worker_successors: Optional[Callable[[Any], List[Any]]] = None
+
+
+def _init_worker(successors: Callable[[Any], List[Any]]) -> None:
+    """
+    进程池初始化函数， 每个工作进程只接收一次 successors， 避免每批任务都重新序列化
+    """
+    global _worker_successors
+    _worker_successors = successors
+
+
+def _expand_batch(batch: List[Any]) -> List[List[Any]]:
+    assert _worker_successors is not None
+    return [_worker_successors(state) for state in batch]
+
+
+def parallel_bfs(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    workers: Optional[int] = None,
+    batch_size: int = 256,
+) -> Optional[Node[T]]:
+    """
+    Docstring for parallel_bfs
+    按层同步的并行 bfs， 适合 successors 计算代价较高的情况
+    每一层的 frontier 被切分成 batch_size 大小的批次， 交给 concurrent.futures 进程池扩展
+    去重 (explored) 和构造 Node 都在父进程中完成， 因此结果与 bfs 一样是最短路径
+    一旦某一层出现目标状态就停止
+
+    successors 和状态都需要能被 pickle， 例如模块级函数、 MCState.successors 或 Maze 的绑定方法
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标， 在父进程中调用
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数， 在工作进程中调用
+    :type successors: Callable[[T], List[T]]
+    :param workers: 进程数， None 表示使用 CPU 核心数
+    :type workers: int | None
+    :param batch_size: 每个任务包含的状态数
+    :type batch_size: int
+    :return: 封装目标状态的 Node
+    :rtype: Node[T] | None
+    """
+    root: Node[T] = Node(initial, None)
+    if goal_test(initial):
+        return root
+    layer: List[Node[T]] = [root]
+    explored: Set[T] = {initial}
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(successors,)
+    ) as executor:
+        while layer:
+            batches: List[List[T]] = [
+                [node.state for node in layer[i : i + batch_size]]
+                for i in range(0, len(layer), batch_size)
+            ]
+            next_layer: List[Node[T]] = []
+            parents: Iterator[Node[T]] = iter(layer)
+            for children_lists in executor.map(_expand_batch, batches):
+                for children in children_lists:
+                    current_node: Node[T] = next(parents)
+                    for child in children:
+                        if child in explored:
+                            continue
+                        explored.add(child)
+                        child_node: Node[T] = Node(
+                            child, current_node, current_node.cost + 1
+                        )
+                        if goal_test(child):
+                            return child_node
+                        next_layer.append(child_node)
+            layer = next_layer
+    return None
+
+
+def _on_path(node: Optional[Node[T]], state: T) -> bool:
+    while node is not None:
+        if node.state == state:
+            return True
+        node = node.parent
+    return False
+
+
+def bfs_solutions(
+    initial: T, goal_test: Callable[[T], bool], successors: Callable[[T], List[T]]
+) -> Generator[Node[T], None, None]:
+    """
+    Docstring for bfs_solutions
+    生成器版本的 bfs， 按路径长度从短到长依次 yield 所有无环的解
+    与 bfs 不同， 这里不使用全局的 explored， 只保证每条路径自身不经过重复状态，
+    因此同一个目标状态可以经由不同路线多次产出
+    生成器挂起时 frontier 保持原样， 取下一个解时从上次停下的地方继续搜索
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数
+    :type successors: Callable[[T], List[T]]
+    :return: 依次产出封装目标状态的 Node
+    :rtype: Generator[Node[T], None, None]
+    """
+    frontier: Queue[Node[T]] = Queue()
+    frontier.push(Node(initial, None))
+
+    while not frontier.empty:
+        current_node: Node[T] = frontier.pop()
+        current_state: T = current_node.state
+        if goal_test(current_state):
+            yield current_node
+            continue
+        for child in successors(current_state):
+            if _on_path(current_node, child):
+                continue
+            frontier.push(Node(child, current_node, current_node.cost + 1))
+
+
+def k_shortest_paths(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], Iterable[Tuple[T, float]]],
+    heuristic: Callable[[T], float],
+) -> Generator[Node[T], None, None]:
+    """
+    Docstring for k_shortest_paths
+    Yen 算法， 按总代价从小到大依次 yield 无环路径， 需要几条就取几条
+    第一条路径由 weighted_astar 求出
+    之后以上一条路径上的每个状态作为偏离点 (spur)， 禁止已找到路径在该处走过的边，
+    并禁止重新经过偏离点之前的状态， 再用 weighted_astar 求偏离点到目标的最短路径，
+    拼接前缀后作为候选放入优先队列， 每次取出代价最小的候选作为下一条路径
+    已找到的路径和候选队列都保存在生成器内部， 继续迭代时不会从 initial 重新开始
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 返回 (后继状态, 单步代价) 的函数
+    :type successors: Callable[[T], Iterable[Tuple[T, float]]]
+    :param heuristic: 启发函数 h(n)
+    :type heuristic: Callable[[T], float]
+    :return: 依次产出封装目标状态的 Node， cost 为路径总代价
+    :rtype: Generator[Node[T], None, None]
+    """
+    first: Optional[Node[T]] = weighted_astar(initial, goal_test, successors, heuristic)
+    if first is None:
+        return
+    found: List[List[Node[T]]] = [_node_chain(first)]
+    seen: Set[Tuple[T, ...]] = {tuple(node_to_path(first))}
+    candidates: PriorityQueue[Tuple[float, int, Node[T]]] = PriorityQueue()
+    counter: int = 0
+    yield first
+
+    while True:
+        last: List[Node[T]] = found[-1]
+        for i in range(len(last) - 1):
+            spur: Node[T] = last[i]
+            root: List[T] = [node.state for node in last[: i + 1]]
+            banned_edges: Set[T] = {
+                path[i + 1].state
+                for path in found
+                if len(path) > i + 1 and [node.state for node in path[: i + 1]] == root
+            }
+            banned_states: Set[T] = set(root[:-1])
+
+            def spur_successors(
+                state: T,
+                spur_state: T = spur.state,
+                banned_edges: Set[T] = banned_edges,
+                banned_states: Set[T] = banned_states,
+            ) -> List[Tuple[T, float]]:
+                return [
+                    (child, cost)
+                    for child, cost in successors(state)
+                    if child not in banned_states
+                    and not (state == spur_state and child in banned_edges)
+                ]
+
+            spur_goal: Optional[Node[T]] = weighted_astar(
+                spur.state, goal_test, spur_successors, heuristic
+            )
+            if spur_goal is None:
+                continue
+            candidate: Node[T] = spur
+            for node in _node_chain(spur_goal)[1:]:
+                candidate = Node(
+                    node.state, candidate, spur.cost + node.cost, node.heuristic
+                )
+            key: Tuple[T, ...] = tuple(node_to_path(candidate))
+            if key in seen:
+                continue
+            seen.add(key)
+            counter += 1
+            candidates.push((candidate.cost, counter, candidate))
+
+        if candidates.empty:
+            return
+        best: Node[T] = candidates.pop()[2]
+        found.append(_node_chain(best))
+        yield best
+
+
+def _node_chain(node: Node[T]) -> List[Node[T]]:
+    """
+    与 node_to_path 类似， 但返回起点到该节点的 Node 列表
+    """
+    chain: List[Node[T]] = [node]
+    while node.parent is not None:
+        node = node.parent
+        chain.append(node)
+    chain.reverse()
+    return chain
+
+
+def _write_record(f: BinaryIO, state: bytes, parent: bytes) -> None:
+    f.write(_RECORD_HEADER.pack(len(state), len(parent)))
+    f.write(state)
+    f.write(parent)
+
+
+def _read_records(path: str) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    顺序读取记录文件， 每条记录为 (状态的编码, 父状态的编码)
+    """
+    with open(path, "rb") as f:
+        while True:
+            header: bytes = f.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            state_size, parent_size = _RECORD_HEADER.unpack(header)
+            yield f.read(state_size), f.read(parent_size)
+
+
+def _write_run(path: str, records: List[Tuple[bytes, bytes]]) -> None:
+    records.sort()
+    with open(path, "wb") as f:
+        last: Optional[bytes] = None
+        for state, parent in records:
+            if state != last:
+                _write_record(f, state, parent)
+                last = state
+
+
+def external_bfs(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    encode: Callable[[T], bytes] = pickle.dumps,
+    decode: Callable[[bytes], T] = pickle.loads,
+    directory: Optional[str] = None,
+    run_size: int = 100000,
+    keep_layers: Optional[int] = None,
+) -> Optional[Node[T]]:
+    """
+    Docstring for external_bfs
+    外存 bfs， frontier 和 explored 都保存在磁盘文件中， 适用于 explored 放不进内存的情况
+    (例如 MAX_NUM 很大的传教士与食人族问题)
+
+    每一层的状态按编码后的字节排序存放在 layer_<k> 文件中， 每条记录同时保存父状态的编码
+    扩展第 k 层时顺序读取该层， 后继先在内存中积累 run_size 条， 排序去重后写成一个 run 文件
+    之后用 heapq.merge 把所有 run 与之前各层的文件归并:
+    与之前层重复的状态被丢弃， 剩下的就是第 k+1 层， 全程不需要内存中的 explored 集合
+    找到目标后， 依次在各层文件中查找父状态的编码即可重建路径
+
+    状态必须能编码为字节， 并且相等的状态编码相同 (默认使用 pickle， 可传入自定义的 encode / decode)
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数
+    :type successors: Callable[[T], List[T]]
+    :param encode: 状态 -> 字节
+    :type encode: Callable[[T], bytes]
+    :param decode: 字节 -> 状态
+    :type decode: Callable[[bytes], T]
+    :param directory: 存放临时文件的目录， 默认新建临时目录并在结束后删除
+    :type directory: str | None
+    :param run_size: 每个 run 文件在内存中积累的记录数
+    :type run_size: int
+    :param keep_layers: 去重时参考的之前层数， None 表示全部; 对无向的状态空间 2 层就足够
+    :type keep_layers: int | None
+    :return: 封装目标状态的 Node
+    :rtype: Node[T] | None
+    """
+    if goal_test(initial):
+        return Node(initial, None)
+    with TemporaryDirectory(dir=directory) as workdir:
+        layers: List[str] = [os.path.join(workdir, "layer_0")]
+        with open(layers[0], "wb") as f:
+            _write_record(f, encode(initial), b"")
+
+        while True:
+            runs: List[str] = []
+            buffer: List[Tuple[bytes, bytes]] = []
+            goal: Optional[Tuple[T, bytes]] = None
+            for state_bytes, _ in _read_records(layers[-1]):
+                for child in successors(decode(state_bytes)):
+                    if goal_test(child):
+                        goal = (child, state_bytes)
+                        break
+                    buffer.append((encode(child), state_bytes))
+                if goal is not None:
+                    break
+                if len(buffer) >= run_size:
+                    runs.append(os.path.join(workdir, "run_{}".format(len(runs))))
+                    _write_run(runs[-1], buffer)
+                    buffer = []
+            if goal is not None:
+                return _external_path(goal[0], goal[1], layers, decode)
+            if buffer:
+                runs.append(os.path.join(workdir, "run_{}".format(len(runs))))
+                _write_run(runs[-1], buffer)
+            if not runs:
+                return None
+
+            previous: List[str] = (
+                layers if keep_layers is None else layers[-keep_layers:]
+            )
+            # 之前层的记录标记为 0， 新生成的标记为 1， 同一状态归并时旧层在前
+            streams: List[Iterator[Tuple[bytes, int, bytes]]] = [
+                ((state, 0, parent) for state, parent in _read_records(layer))
+                for layer in previous
+            ] + [
+                ((state, 1, parent) for state, parent in _read_records(run))
+                for run in runs
+            ]
+            next_layer: str = os.path.join(workdir, "layer_{}".format(len(layers)))
+            written: int = 0
+            with open(next_layer, "wb") as f:
+                last: Optional[bytes] = None
+                for state, tag, parent in merge(*streams):
+                    if state == last:
+                        continue
+                    last = state
+                    if tag == 1:
+                        _write_record(f, state, parent)
+                        written += 1
+            for run in runs:
+                os.remove(run)
+            if written == 0:
+                return None
+            layers.append(next_layer)
+
+
+def _external_path(
+    goal: T, parent: bytes, layers: List[str], decode: Callable[[bytes], T]
+) -> Node[T]:
+    """
+    从最后一层开始， 在每一层文件中找到父状态的记录， 逐层回溯到起点
+    """
+    states: List[T] = [goal]
+    for layer in reversed(layers):
+        for state_bytes, grandparent in _read_records(layer):
+            if state_bytes == parent:
+                states.append(decode(state_bytes))
+                parent = grandparent
+                break
+    states.reverse()
+    node: Node[T] = Node(states[0], None)
+    for state in states[1:]:
+        node = Node(state, node, node.cost + 1)
+    return node
+
+
+class CancellationToken:
+    """
+    Docstring for CancellationToken
+    跨线程取消搜索的标记， 由调用方持有并在需要时调用 cancel()
+    """
+
+    def __init__(self) -> None:
+        self._event: Event = Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class AnytimeResult(Generic[T]):
+    """
+    Docstring for AnytimeResult
+    node: 目前为止找到的最好解， 没有找到任何解时为 None
+    bound: 次优界， 最优解的代价不小于 node.cost / bound; 1.0 表示已证明最优， 没有解时为 inf
+    """
+
+    def __init__(self, node: Optional[Node[T]], bound: float) -> None:
+        self.node: Optional[Node[T]] = node
+        self.bound: float = bound
+
+    @property
+    def optimal(self) -> bool:
+        return self.node is not None and self.bound <= 1.0
+
+    def __repr__(self) -> str:
+        cost: Optional[float] = None if self.node is None else self.node.cost
+        return "AnytimeResult(cost={}, bound={})".format(cost, self.bound)
+
+
+def _anytime_steps(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    heuristic: Callable[[T], float],
+    weight: float,
+    weight_step: float,
+    deadline: Optional[float],
+    token: Optional[CancellationToken],
+    yield_every: int,
+) -> Generator[None, None, AnytimeResult[T]]:
+    """
+    anytime_astar 的主体， 每扩展 yield_every 个节点 yield 一次， 结束时通过 return 给出结果
+    """
+    counter: int = 0
+
+    def entry(node: Node[T]) -> Tuple[float, float, int, Node[T]]:
+        nonlocal counter
+        counter += 1
+        return (node.cost + weight * node.heuristic, node.heuristic, counter, node)
+
+    frontier: PriorityQueue[Tuple[float, float, int, Node[T]]] = PriorityQueue()
+    frontier.push(entry(Node(initial, None, 0.0, heuristic(initial))))
+    best_cost: Dict[T, float] = {initial: 0.0}
+    incumbent: Optional[Node[T]] = None
+    expansions: int = 0
+
+    while not frontier.empty:
+        if (token is not None and token.cancelled) or (
+            deadline is not None and monotonic() >= deadline
+        ):
+            break
+        current_node: Node[T] = frontier.pop()[3]
+        current_state: T = current_node.state
+        if current_node.cost > best_cost[current_state]:
+            continue
+        if (
+            incumbent is not None
+            and current_node.cost + current_node.heuristic >= incumbent.cost
+        ):
+            continue
+        if goal_test(current_state):
+            incumbent = current_node
+            if weight > 1.0 and weight_step > 0.0:
+                # 收紧权重， 用新的权重重新排列 frontier
+                weight = max(1.0, weight - weight_step)
+                remaining: List[Node[T]] = []
+                while not frontier.empty:
+                    remaining.append(frontier.pop()[3])
+                for node in remaining:
+                    frontier.push(entry(node))
+            continue
+
+        for child in successors(current_state):
+            new_cost: float = current_node.cost + 1
+            if child in best_cost and best_cost[child] <= new_cost:
+                continue
+            h: float = heuristic(child)
+            if incumbent is not None and new_cost + h >= incumbent.cost:
+                continue
+            best_cost[child] = new_cost
+            frontier.push(entry(Node(child, current_node, new_cost, h)))
+
+        expansions += 1
+        if expansions % yield_every == 0:
+            yield
+
+    if incumbent is None:
+        return AnytimeResult(None, inf)
+    # frontier 中仍可能改进解的节点里最小的 g + h 是最优代价的下界
+    lower: float = incumbent.cost
+    while not frontier.empty:
+        node: Node[T] = frontier.pop()[3]
+        if node.cost <= best_cost[node.state]:
+            lower = min(lower, node.cost + node.heuristic)
+    return AnytimeResult(incumbent, incumbent.cost / lower if lower > 0 else 1.0)
+
+
+def anytime_astar(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    heuristic: Callable[[T], float],
+    weight: float = 3.0,
+    weight_step: float = 0.5,
+    deadline: Optional[float] = None,
+    token: Optional[CancellationToken] = None,
+) -> AnytimeResult[T]:
+    """
+    Docstring for anytime_astar
+    Anytime 加权 A*
+    按 f(n) = g(n) + weight * h(n) 排序， 可以很快找到第一个 (不一定最优的) 解
+    找到解后继续搜索， 剪掉 g(n) + h(n) 不小于当前解代价的节点， 每找到更好的解就把 weight 减小 weight_step，
+    frontier 耗尽时当前解即为最优解
+    到达 deadline 或 token 被取消时立即停止， 返回目前最好的解及其次优界
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal_test: 判断是否抵达目标
+    :type goal_test: Callable[[T], bool]
+    :param successors: 后继函数， 每一跳成本视为 1
+    :type successors: Callable[[T], List[T]]
+    :param heuristic: 可采纳的启发函数 h(n)， 次优界依赖于它
+    :type heuristic: Callable[[T], float]
+    :param weight: 初始权重
+    :type weight: float
+    :param weight_step: 每次找到更好的解后权重的减小量， 0 表示保持不变
+    :type weight_step: float
+    :param deadline: 截止时间， 以 time.monotonic() 为准的绝对时间
+    :type deadline: float | None
+    :param token: 取消标记
+    :type token: CancellationToken | None
+    :return: 目前最好的解及其次优界
+    :rtype: AnytimeResult[T]
+    """
+    steps = _anytime_steps(
+        initial,
+        goal_test,
+        successors,
+        heuristic,
+        weight,
+        weight_step,
+        deadline,
+        token,
+        1,
+    )
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def anytime_astar_async(
+    initial: T,
+    goal_test: Callable[[T], bool],
+    successors: Callable[[T], List[T]],
+    heuristic: Callable[[T], float],
+    weight: float = 3.0,
+    weight_step: float = 0.5,
+    deadline: Optional[float] = None,
+    token: Optional[CancellationToken] = None,
+    yield_every: int = 1000,
+) -> AnytimeResult[T]:
+    """
+    Docstring for anytime_astar_async
+    anytime_astar 的 asyncio 版本， 每扩展 yield_every 个节点就 await asyncio.sleep(0)，
+    把控制权交还给事件循环， 不会长时间阻塞其它协程
+    参数与 anytime_astar 相同
+    """
+    steps = _anytime_steps(
+        initial,
+        goal_test,
+        successors,
+        heuristic,
+        weight,
+        weight_step,
+        deadline,
+        token,
+        yield_every,
+    )
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+        await asyncio.sleep(0)
+
+
+def bidirectional_bfs(
+    initial: T,
+    goal: T,
+    successors: Callable[[T], List[T]],
+    predecessors: Optional[Callable[[T], List[T]]] = None,
+) -> Optional[Node[T]]:
+    """
+    Docstring for bidirectional_bfs
+    双向广度优先搜索， 适用于目标状态已知的情况
+    分别从 initial 和 goal 同时扩展 frontier， 每次只扩展规模较小的一侧的一整层
+    两侧相遇即得到最短路径
+    单向 bfs 需要扩展半径为 d 的全部状态， 双向只需扩展两个半径为 d/2 的区域
+    在开阔的迷宫中扩展的节点数大约是单向的平方根量级
+
+    explored 用 dict 记录 状态 -> 父状态， 而不是为每个状态创建 Node
+    相遇后才把整条路径拼接成 Node 链， 因此 node_to_path 可以直接使用
+
+    :param initial: 起点状态
+    :type initial: T
+    :param goal: 目标状态
+    :type goal: T
+    :param successors: 正向后继函数
+    :type successors: Callable[[T], List[T]]
+    :param predecessors: 反向前驱函数， 对 Maze.successors 这种无向空间可省略， 默认复用 successors
+    :type predecessors: Callable[[T], List[T]] | None
+    :return: 封装 goal 的 Node， 无解时返回 None
+    :rtype: Node[T] | None
+    """
+    if predecessors is None:
+        predecessors = successors
+    if initial == goal:
+        return Node(initial, None)
+
+    forward_parents: Dict[T, Optional[T]] = {initial: None}
+    backward_parents: Dict[T, Optional[T]] = {goal: None}
+    forward_frontier: List[T] = [initial]
+    backward_frontier: List[T] = [goal]
+    meet: Optional[T] = None
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meet = _expand_layer(
+                forward_frontier, successors, forward_parents, backward_parents
+            )
+        else:
+            backward_frontier, meet = _expand_layer(
+                backward_frontier, predecessors, backward_parents, forward_parents
+            )
+        if meet is not None:
+            return _join_parents(meet, forward_parents, backward_parents)
     return None
 
 
+def _expand_layer(
+    frontier: List[T],
+    expand: Callable[[T], List[T]],
+    parents: Dict[T, Optional[T]],
+    other_parents: Dict[T, Optional[T]],
+) -> Tuple[List[T], Optional[T]]:
+    """
+    扩展 frontier 的一整层， 若碰到另一侧已访问的状态则立即返回相遇点
+    """
+    next_frontier: List[T] = []
+    for state in frontier:
+        for child in expand(state):
+            if child in parents:
+                continue
+            parents[child] = state
+            if child in other_parents:
+                return next_frontier, child
+            next_frontier.append(child)
+    return next_frontier, None
+
+
+def _join_parents(
+    meet: T,
+    forward_parents: Dict[T, Optional[T]],
+    backward_parents: Dict[T, Optional[T]],
+) -> Node[T]:
+    """
+    从相遇点分别沿两侧的父状态回溯， 拼接出 initial -> goal 的 Node 链
+    """
+    states: List[T] = []
+    current: Optional[T] = meet
+    while current is not None:
+        states.append(current)
+        current = forward_parents[current]
+    states.reverse()
+    current = backward_parents[meet]
+    while current is not None:
+        states.append(current)
+        current = backward_parents[current]
+
+    node: Node[T] = Node(states[0], None)
+    for state in states[1:]:
+        node = Node(state, node, node.cost + 1)
+    return node
+
+
 def node_to_path(node: Node[T]) -> List[T]:
     """
     Docstring for node_to_path
@@ -295,7 +1675,80 @@ def binary_contains(sequence: Sequence[C], key: C) -> bool:
     return False
 
 
+class MembershipIndex(Generic[T]):
+    """
+    Docstring for MembershipIndex
+    批量成员查询
+    linear_contains 和 binary_contains 每次只查一个 key， 对同一序列反复查询时效率很低
+    MembershipIndex 只在构造时建立一次索引， 之后每批 key 都复用它
+
+    mode="sorted": 把 (元素, 原始下标) 排好序， 查询时对排好序的元素做 bisect， 元素需可比较
+    mode="hash": 用 dict 记录元素第一次出现的下标， 适用于不可比较但可哈希的元素
+
+    positions 返回元素在原序列中第一次出现的下标， 不存在为 -1
+    """
+
+    def __init__(self, sequence: Iterable[T], mode: str = "sorted") -> None:
+        if mode not in ("sorted", "hash"):
+            raise ValueError("mode should be 'sorted' or 'hash'.")
+        self.mode: str = mode
+        self._first: Dict[T, int] = {}
+        self._keys: List[T] = []
+        self._indices: List[int] = []
+        if mode == "hash":
+            for index, item in enumerate(sequence):
+                self._first.setdefault(item, index)
+        else:
+            pairs: List[Tuple[Any, int]] = sorted(
+                (item, index) for index, item in enumerate(sequence)
+            )
+            self._keys = [item for item, _ in pairs]
+            self._indices = [index for _, index in pairs]
+
+    def __len__(self) -> int:
+        return len(self._first) if self.mode == "hash" else len(self._keys)
+
+    def position(self, key: T) -> int:
+        if self.mode == "hash":
+            return self._first.get(key, -1)
+        i: int = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._indices[i]
+        return -1
+
+    def positions(self, keys: Iterable[T]) -> List[int]:
+        """
+        Docstring for positions
+
+        :param keys: 要查询的一批元素
+        :type keys: Iterable[T]
+        :return: 每个元素第一次出现的下标， 不存在为 -1
+        :rtype: List[int]
+        """
+        if self.mode == "hash":
+            first: Dict[T, int] = self._first
+            return [first.get(key, -1) for key in keys]
+        return [self.position(key) for key in keys]
+
+    def contains(self, keys: Iterable[T]) -> List[bool]:
+        """
+        Docstring for contains
+
+        :param keys: 要查询的一批元素
+        :type keys: Iterable[T]
+        :return: 与 keys 一一对应的布尔列表
+        :rtype: List[bool]
+        """
+        if self.mode == "hash":
+            first: Dict[T, int] = self._first
+            return [key in first for key in keys]
+        return [position != -1 for position in self.positions(keys)]
+
+
 if __name__ == "__main__":
     print(linear_contains([1, 5, 15, 15, 15, 15, 20], 5))
     print(binary_contains(["a", "d", "e", "f", "z"], "f"))
     print(binary_contains(["john", "mark", "ronald", "sarah"], "sheila"))
+    index: MembershipIndex[int] = MembershipIndex([1, 5, 15, 15, 15, 15, 20])
+    print(index.contains([5, 7, 20]))
+    print(index.positions([15, 1, 3]))
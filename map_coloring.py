@@ -59,8 +59,15 @@ if __name__ == "__main__":
     csp.add_constraint(MapColoringConstraint(Place.VI, Place.NSW))
     csp.add_constraint(MapColoringConstraint(Place.VI, Place.TA))
 
-    solution: Optional[Dict[Place, Color]] = csp.backtracking_search()
+    solution: Optional[Dict[Place, Color]] = csp.backtracking_search(
+        variable_order="mrv_degree", value_order="lcv", propagation="mac"
+    )
     if solution is None:
         print("No sulution found !")
     else:
         print(solution)
+
+    csp.add_value_symmetry()
+    for coloring in csp.solutions(break_symmetry=True):
+        print(coloring)
+    print("all colorings:", csp.count_solutions(break_symmetry=True))
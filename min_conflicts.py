@@ -0,0 +1,236 @@
+# 回溯搜索是系统性的， 变量一多 (例如上千列的 N 皇后) 就无能为力
+# 最小冲突 (min-conflicts) 是一种局部搜索:
+# 先给所有变量一个完整的赋值， 然后反复挑一个有冲突的变量， 把它改成冲突最少的值
+# 不保证找到解， 也无法证明无解， 但对解很稠密的大问题往往只需要很少的步数
+from abc import ABC, abstractmethod
+from random import Random
+from time import monotonic
+from typing import Any, Dict, Generic, Iterable, List, Optional, Set, Tuple
+from csp import CSP, Constraint, V, D
+
+
+class ConflictCounter(Generic[V, D], ABC):
+    """
+    Docstring for ConflictCounter
+    min_conflicts 通过它读取和修改赋值， 并增量维护冲突计数
+    默认的 ConstraintCounter 适用于任意 CSP， 针对特定问题的子类可以做到 O(1) 查询
+    (例如 queens.QueenCounter)
+    """
+
+    @abstractmethod
+    def reset(self, assignment: Dict[V, D]) -> None:
+        """
+        开始 (或重启) 时调用， assignment 是空的 dict， 之后只通过 move 修改
+        """
+
+    @abstractmethod
+    def conflicts(self, variable: V, value: D) -> int:
+        """
+        variable 取 value 时与其他已赋值变量之间的冲突数 (不计 variable 当前的值)
+        """
+
+    @abstractmethod
+    def move(self, variable: V, value: D) -> Iterable[V]:
+        """
+        把 variable 赋值或改为 value， 并更新计数
+        返回因此变为有冲突的变量， 不必完整: min_conflicts 最终会全量检查一次
+        """
+
+    def candidates(
+        self, variable: V, domain: List[D], rng: Random, sample: Optional[int]
+    ) -> Iterable[D]:
+        """
+        给 variable 挑选候选值时要比较的值
+        sample 为 None 时是整个值域， 否则随机抽取 sample 个
+        """
+        if sample is None or sample >= len(domain):
+            return domain
+        return (domain[rng.randrange(len(domain))] for _ in range(sample))
+
+
+class ConstraintCounter(ConflictCounter[V, D]):
+    """
+    Docstring for ConstraintCounter
+    基于 CSP 约束的通用计数器
+    记录当前不满足的约束以及每个变量涉及的不满足约束数，
+    改变一个变量时只重新检查这个变量的约束， 而不是重新检查整个 CSP
+    冲突数按不满足的约束个数计算， 只有约束足够细 (例如每对变量一个二元约束) 时才能引导搜索;
+    像 queens.QueenConstraint 这样覆盖全部变量的单个约束， 每个取值的冲突数都是 1，
+    min_conflicts 退化为随机游走， 连 50 皇后都解不出来， 这时应使用 queens.QueenCounter
+    """
+
+    def __init__(self, csp: CSP[V, D]) -> None:
+        self._csp: CSP[V, D] = csp
+        self._assignment: Dict[V, D] = {}
+        self._violated: Set[Constraint[V, D]] = set()
+        self._violations: Dict[V, int] = {}
+
+    def reset(self, assignment: Dict[V, D]) -> None:
+        self._assignment = assignment
+        self._violated = set()
+        self._violations = {v: 0 for v in self._csp.variables}
+
+    def conflicts(self, variable: V, value: D) -> int:
+        assignment: Dict[V, D] = self._assignment
+        missing: object = object()
+        old: object = assignment.get(variable, missing)
+        assignment[variable] = value
+        count: int = sum(
+            1
+            for constraint in self._csp.constraints[variable]
+            if not constraint.satisfiled(assignment)
+        )
+        if old is missing:
+            del assignment[variable]
+        else:
+            assignment[variable] = old  # type: ignore[assignment]
+        return count
+
+    def move(self, variable: V, value: D) -> Iterable[V]:
+        self._assignment[variable] = value
+        conflicted: List[V] = []
+        for constraint in self._csp.constraints[variable]:
+            was: bool = constraint in self._violated
+            now: bool = not constraint.satisfiled(self._assignment)
+            if was == now:
+                continue
+            change: int = 1 if now else -1
+            if now:
+                self._violated.add(constraint)
+            else:
+                self._violated.discard(constraint)
+            for v in constraint.variables:
+                self._violations[v] += change
+                if now and self._violations[v] == 1:
+                    conflicted.append(v)
+        return conflicted
+
+
+def min_conflicts(
+    csp: CSP[V, D],
+    counter: Optional[ConflictCounter[V, D]] = None,
+    max_steps: int = 100000,
+    time_limit: Optional[float] = None,
+    restart_after: Optional[int] = None,
+    tabu: int = 0,
+    sample: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Optional[Dict[V, D]]:
+    """
+    Docstring for min_conflicts
+    最小冲突局部搜索
+    初始赋值是贪心的: 按声明顺序给每个变量取与已赋值变量冲突最少的值
+    之后每一步随机挑一个有冲突的变量， 改为冲突最少的值 (并列时随机选)
+
+    :param csp: 变量、 值域和约束
+    :type csp: CSP[V, D]
+    :param counter: 冲突计数器， 默认为 ConstraintCounter(csp)
+    :type counter: ConflictCounter[V, D] | None
+    :param max_steps: 所有重启合计的最大步数
+    :type max_steps: int
+    :param time_limit: 最长运行秒数， None 表示不限
+    :type time_limit: float | None
+    :param restart_after: 每次重启最多走的步数， None 表示不重启
+    :type restart_after: int | None
+    :param tabu: 一个变量改掉某个值后， 这么多步之内不能改回去， 值需要可哈希
+    :type tabu: int
+    :param sample: 每一步随机比较的候选值个数， None 表示比较整个值域
+    :type sample: int | None
+    :param seed: 随机种子
+    :type seed: int | None
+    :return: 解， 预算用完仍未找到时返回 None
+    :rtype: Dict[V, D] | None
+    """
+    rng: Random = Random(seed)
+    if counter is None:
+        counter = ConstraintCounter(csp)
+    deadline: Optional[float] = None
+    if time_limit is not None:
+        deadline = monotonic() + time_limit
+    step: int = 0
+    # 表示 "没有当前值" / "没有候选值" 的标记， 值域里可能有 None， 不能用 None
+    missing: Any = object()
+
+    def best_value(
+        variable: V,
+        tabu_until: Dict[Tuple[V, D], int],
+        current: D = missing,
+        conflicts: int = -1,
+    ) -> D:
+        # 修复时把当前值也算作候选， 抽样比较时不会换成更差的值
+        best: List[D] = [] if current is missing else [current]
+        fewest: int = conflicts
+        for value in counter.candidates(variable, csp.domains[variable], rng, sample):
+            if value == current:
+                continue
+            if tabu and tabu_until.get((variable, value), -1) > step:
+                continue
+            count: int = counter.conflicts(variable, value)
+            if fewest < 0 or count < fewest:
+                fewest, best = count, [value]
+                # 随机抽样的候选值本身就是随机顺序， 没有冲突的值不可能被超过
+                if count == 0 and sample is not None:
+                    break
+            elif count == fewest:
+                best.append(value)
+        if len(best) > 1:
+            return rng.choice(best)
+        return best[0] if best else missing
+
+    while True:
+        assignment: Dict[V, D] = {}
+        counter.reset(assignment)
+        # 有冲突的变量， 只增不减地追加， 挑中时发现已经没有冲突再移除
+        conflicted: List[V] = []
+        listed: Set[V] = set()
+        for variable in csp.variables:
+            value: D = best_value(variable, {})
+            if value is missing:
+                return None  # 值域为空
+            for v in counter.move(variable, value):
+                if v not in listed:
+                    listed.add(v)
+                    conflicted.append(v)
+
+        tabu_until: Dict[Tuple[V, D], int] = {}
+        local: int = 0
+        scanned: int = 0
+        while True:
+            # 计数器报告的冲突可能不完整， 列表为空或每走过 len(variables) 步时全量检查一次，
+            # 否则可能一直在几个已知变量上打转， 看不到与之冲突的其他变量 (均摊每步 O(1))
+            if not conflicted or local - scanned >= len(csp.variables):
+                conflicted = [
+                    v for v in csp.variables if counter.conflicts(v, assignment[v]) > 0
+                ]
+                listed = set(conflicted)
+                scanned = local
+                if not conflicted:
+                    return assignment
+            if step >= max_steps:
+                return None
+            if deadline is not None and step % 256 == 0 and monotonic() > deadline:
+                return None
+            if restart_after is not None and local >= restart_after:
+                break
+
+            position: int = rng.randrange(len(conflicted))
+            variable = conflicted[position]
+            current: D = assignment[variable]
+            count: int = counter.conflicts(variable, current)
+            if count == 0:
+                conflicted[position] = conflicted[-1]
+                conflicted.pop()
+                listed.discard(variable)
+                continue
+
+            step += 1
+            local += 1
+            value = best_value(variable, tabu_until, current, count)
+            if value is missing or value == current:
+                continue
+            if tabu:
+                tabu_until[(variable, current)] = step + tabu
+            for v in counter.move(variable, value):
+                if v not in listed:
+                    listed.add(v)
+                    conflicted.append(v)
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from generic_search import bfs, Node, node_to_path
+from generic_search import bfs, external_bfs, Node, node_to_path
 
 MAX_NUM: int = 3
 
@@ -81,6 +81,25 @@ class MCState:
         return [x for x in sucs if x.is_legal]
 
 
+def encode_state(state: MCState) -> bytes:
+    """
+    Docstring for encode_state
+    external_bfs 使用的编码， 相同的状态总是得到相同的字节
+    MCState 没有实现 __eq__ / __hash__， 直接 pickle 无法用于去重
+
+    :param state: 状态
+    :type state: MCState
+    :return: 编码
+    :rtype: bytes
+    """
+    return "{},{},{}".format(state.wm, state.wc, int(state.boat)).encode()
+
+
+def decode_state(data: bytes) -> MCState:
+    wm, wc, boat = data.decode().split(",")
+    return MCState(int(wm), int(wc), boat == "1")
+
+
 def display_soulution(path: List[MCState]) -> None:
     """
     Docstring for display_soulution
@@ -122,3 +141,13 @@ if __name__ == "__main__":
     else:
         path: List[MCState] = node_to_path(solution)
         display_soulution(path)
+
+    external: Optional[Node[MCState]] = external_bfs(
+        start, MCState.goal_test, MCState.successors, encode_state, decode_state
+    )
+    if external is not None:
+        print(
+            "external bfs found a {}-step solution".format(
+                len(node_to_path(external)) - 1
+            )
+        )
@@ -0,0 +1,247 @@
+import json
+import random
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from math import inf
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from generic_search import Node, SearchStats, astar, bfs, dfs, node_to_path
+from maze import (
+    ArrayMaze,
+    Maze,
+    MazeLocation,
+    euclidean_distance,
+    manhattan_distance,
+)
+
+Record = Dict[str, Any]
+Engine = Callable[[Maze, Optional[SearchStats]], Optional[Node[MazeLocation]]]
+
+ENGINES: Dict[str, Engine] = {
+    "dfs": lambda maze, stats: dfs(maze.start, maze.goal_test, maze.successors, stats),
+    "bfs": lambda maze, stats: bfs(maze.start, maze.goal_test, maze.successors, stats),
+    "astar_euclidean": lambda maze, stats: astar(
+        maze.start,
+        maze.goal_test,
+        maze.successors,
+        euclidean_distance(maze.goal),
+        stats,
+    ),
+    "astar_manhattan": lambda maze, stats: astar(
+        maze.start,
+        maze.goal_test,
+        maze.successors,
+        manhattan_distance(maze.goal),
+        stats,
+    ),
+}
+
+DEFAULT_SIZES: List[int] = [10, 100, 1000, 4000]
+DEFAULT_SPARSENESS: List[float] = [0.0, 0.1, 0.2, 0.3, 0.4]
+
+
+def generate_maze(size: int, sparseness: float, seed: int, array: bool = False) -> Maze:
+    """
+    Docstring for generate_maze
+    用固定的随机种子生成 size x size 的迷宫， 起点在左上角， 目标在右下角
+    同样的参数总能得到同样的迷宫， 不同版本的代码之间才有可比性
+
+    :param size: 迷宫边长
+    :type size: int
+    :param sparseness: 路障比例
+    :type sparseness: float
+    :param seed: 随机种子
+    :type seed: int
+    :param array: 是否使用 ArrayMaze
+    :type array: bool
+    :return: 迷宫
+    :rtype: Maze
+    """
+    random.seed(seed)
+    cls: type = ArrayMaze if array else Maze
+    return cls(
+        size,
+        size,
+        sparseness,
+        MazeLocation(0, 0),
+        MazeLocation(size - 1, size - 1),
+    )
+
+
+def run_one(engine: str, maze: Maze, repeat: int = 3) -> Record:
+    """
+    Docstring for run_one
+    先在不开启任何统计的情况下运行 repeat 次， 取最短耗时以减小噪声;
+    再开启 SearchStats 和 tracemalloc 运行一次， 记录扩展节点数和内存峰值
+    (tracemalloc 会明显拖慢搜索， 所以不与计时放在同一次)
+
+    :param engine: ENGINES 中的名字
+    :type engine: str
+    :param maze: 迷宫
+    :type maze: Maze
+    :param repeat: 计时的重复次数
+    :type repeat: int
+    :return: 一条结果记录
+    :rtype: Record
+    """
+    search: Engine = ENGINES[engine]
+    elapsed: float = inf
+    for _ in range(repeat):
+        begin: float = perf_counter()
+        search(maze, None)
+        elapsed = min(elapsed, perf_counter() - begin)
+
+    stats: SearchStats = SearchStats()
+    tracemalloc.start()
+    solution: Optional[Node[MazeLocation]] = search(maze, stats)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "engine": engine,
+        "time": elapsed,
+        "expanded": stats.expanded,
+        "peak_memory": peak,
+        "path_length": None if solution is None else len(node_to_path(solution)),
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    sparsenesses: List[float],
+    engines: List[str],
+    seed: int = 0,
+    array: bool = False,
+    repeat: int = 3,
+) -> List[Record]:
+    records: List[Record] = []
+    for size in sizes:
+        for sparseness in sparsenesses:
+            maze: Maze = generate_maze(size, sparseness, seed, array)
+            for engine in engines:
+                record: Record = run_one(engine, maze, repeat)
+                record.update(
+                    {
+                        "maze": type(maze).__name__,
+                        "size": size,
+                        "sparseness": sparseness,
+                        "seed": seed,
+                    }
+                )
+                records.append(record)
+                print(
+                    "{engine:>16} {maze:>9} {size:>5} {sparseness:.2f} "
+                    "time={time:.4f}s expanded={expanded} "
+                    "peak={peak_memory}B path={path_length}".format(**record)
+                )
+    return records
+
+
+def _key(record: Record) -> tuple:
+    # Maze 与 ArrayMaze 用同一个种子生成的格子不同， 必须区分
+    return (
+        record["engine"],
+        record.get("maze", "unknown"),
+        record["size"],
+        record["sparseness"],
+        record["seed"],
+    )
+
+
+def compare(
+    records: List[Record], baseline: List[Record], threshold: float = 0.1
+) -> List[str]:
+    """
+    Docstring for compare
+    与保存的基准结果逐条比较
+    耗时或内存峰值超过基准 (1 + threshold) 倍、 扩展节点数变多或路径长度改变都视为退化
+    只比较同一种迷宫 (Maze / ArrayMaze) 上的结果， 两边没有共同的迷宫类型时抛出 ValueError
+
+    :param records: 本次结果
+    :type records: List[Record]
+    :param baseline: 基准结果
+    :type baseline: List[Record]
+    :param threshold: 允许的相对波动
+    :type threshold: float
+    :return: 退化描述， 为空表示没有退化
+    :rtype: List[str]
+    """
+    backends: Set[Any] = {r.get("maze", "unknown") for r in records}
+    baseline_backends: Set[Any] = {r.get("maze", "unknown") for r in baseline}
+    if records and baseline and not backends & baseline_backends:
+        raise ValueError(
+            "Baseline was recorded on {} but this run uses {}.".format(
+                ", ".join(sorted(map(str, baseline_backends))),
+                ", ".join(sorted(map(str, backends))),
+            )
+        )
+    previous: Dict[tuple, Record] = {_key(r): r for r in baseline}
+    regressions: List[str] = []
+    for record in records:
+        old: Optional[Record] = previous.get(_key(record))
+        if old is None:
+            continue
+        name: str = "{} {} size={} sparseness={}".format(*_key(record)[:4])
+        for field in ("time", "peak_memory"):
+            if record[field] > old[field] * (1 + threshold):
+                regressions.append(
+                    "{}: {} {} -> {} ({:+.1%})".format(
+                        name,
+                        field,
+                        old[field],
+                        record[field],
+                        record[field] / old[field] - 1 if old[field] else 0.0,
+                    )
+                )
+        if record["expanded"] > old["expanded"]:
+            regressions.append(
+                "{}: expanded {} -> {}".format(
+                    name, old["expanded"], record["expanded"]
+                )
+            )
+        if record["path_length"] != old["path_length"]:
+            regressions.append(
+                "{}: path_length {} -> {}".format(
+                    name, old["path_length"], record["path_length"]
+                )
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(
+        description="Benchmark dfs / bfs / astar on seeded mazes."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--sparseness", type=float, nargs="+", default=DEFAULT_SPARSENESS
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--array", action="store_true", help="use ArrayMaze")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a saved JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results: List[Record] = run_benchmarks(
+        args.sizes, args.sparseness, args.engines, args.seed, args.array, args.repeat
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline: List[Record] = json.load(f)
+        try:
+            regressions: List[str] = compare(results, baseline, args.threshold)
+        except ValueError as error:
+            sys.exit(str(error))
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)